@@ -1,13 +1,49 @@
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+from matplotlib.figure import Figure
 import tkinter as tk
 from tkinter import ttk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter.font as tkfont
 
 from tkinter import messagebox
+from tkinter import filedialog
 
+from wave_physics import (
+    format_frequency, solve_wave_params,
+    describe_wave, FieldCache, adaptive_grid, MAX_SEGMENT_POINTS_3D,
+)
+import wave_physics
+from dispersion import MATERIALS, material_table
+from fdtd import FDTD1D
+from pulse import WidebandPulse
+from frame_profiler import FrameProfiler
+from frame_pipeline import FrameRing, FrameProducer
+from decimation import LineDecimator
+from oblique import ObliqueBoundary, FieldMap
+from session import save_session, load_session, SESSION_EXTENSION
+from recorder import FrameRecorder, Recording
+
+
+# Command-line options
+arg_parser = argparse.ArgumentParser(description="Electromagnetic waves in a lossy dielectric")
+arg_parser.add_argument('--profile', action='store_true',
+                        help="time the hot paths and show frame rates in an overlay")
+arg_parser.add_argument('--trace', metavar='FILE',
+                        help="on exit, write the timings as a Chrome trace (implies --profile)")
+arg_parser.add_argument('--threaded-frames', action='store_true',
+                        help="compute 2D frames on a background thread into a shared-memory ring buffer")
+arg_parser.add_argument('--frames-per-period', type=int, metavar='N',
+                        help="render one wave period as N frames once and replay them")
+cli_args, _ = arg_parser.parse_known_args()
+if cli_args.frames_per_period is not None and cli_args.frames_per_period < 1:
+    arg_parser.error("--frames-per-period must be at least 1")
+
+# Opt-in instrumentation; the timed() decorators are no-ops unless enabled
+profiler = FrameProfiler(enabled=cli_args.profile or cli_args.trace is not None)
 
 # Constants and initial parameters
 freq = 1.5e8  # Frequency in Hz
@@ -15,6 +51,30 @@ amplitude = 1.0  # Amplitude of the wave
 epsilon_r = 1.0  # Relative permittivity of the dielectric
 sigma = 0.01  # Conductivity of the dielectric
 mu_r = 1.0  # Relative permeability of the dielectric
+material = None  # DispersionTable of the selected library material, None for custom values
+
+# Animation frames are rotations of phasors computed once per parameter change.
+# With --frames-per-period (e.g. 64) one period is instead rendered into a
+# ring buffer and replayed, which is cheaper still on slow machines.
+FRAMES_PER_PERIOD = cli_args.frames_per_period
+
+# Time-domain engines: (solver, waveform) for each engine choice, and a cap
+# on FDTD grid steps per frame so fine grids slow down instead of stalling.
+# The wideband engine synthesizes a pulse from its spectrum on a fixed grid.
+ENGINES = {
+    "Analytic": None,
+    "FDTD (switch-on)": ('fdtd', 'cw'),
+    "FDTD (smooth start)": ('fdtd', 'ramp'),
+    "FDTD (pulse)": ('fdtd', 'pulse'),
+    "Wideband (Gaussian pulse)": ('wideband', 'gaussian'),
+    "Wideband (modulated pulse)": ('wideband', 'modulated'),
+}
+FDTD_MAX_STEPS_PER_FRAME = 200
+WIDEBAND_X_POINTS = 1000
+
+# Ring buffer used with --threaded-frames: slots, and floats per frame
+FRAME_RING_SLOTS = 4
+FRAME_RING_CAPACITY = 1 << 17
 
 # Color scheme
 DARK_BG = '#1E1E1E'  # Dark gray/black background
@@ -26,44 +86,6 @@ BUTTON_ACTIVE_BG = '#CCCCCC'  # Light gray for active state
 ENTRY_BG = '#2D2D2D'  # Dark gray entry background
 
 
-def format_frequency(value):
-    if value >= 1e9:
-        return f"{value / 1e9:.2f} GHz"
-    elif value >= 1e6:
-        return f"{value / 1e6:.2f} MHz"
-    elif value >= 1e3:
-        return f"{value / 1e3:.2f} kHz"
-    else:
-        return f"{value:.2f} Hz"
-def format_distance(value, precision=1):
-    if value >= 1:
-        return f"{value :.{precision}f} m"
-    elif value >= 1e-2:
-        return f"{value * 1e2:.{precision}f} cm"
-    else:
-        return f"{value * 1e3:.{precision}f} mm"
-    
-def format_scientific(value, precision=1):
-    def format_part(part):
-        formatted_part = f"{part:.{precision}e}"
-        base, exponent = formatted_part.split("e")
-        exponent = int(exponent)
-        if exponent == 0:
-            return f"{float(base):.{precision}f}"
-        else:
-            return f"{float(base):.{precision}f} x 10^({exponent})"
-
-    if isinstance(value, complex):
-        real_part = format_part(value.real)
-        imag_part = format_part(value.imag)
-        if value.imag > 0: return f"{real_part} + j{imag_part}"
-        elif value.imag < 0: return f"{real_part} - j{imag_part[1:]}"
-        else: return f"{real_part}"
-    else:
-        
-        return format_part(value)
-
-
 # Create custom button style
 def create_custom_button(parent, text, command):
     button = tk.Button(
@@ -129,6 +151,17 @@ style.map('Dark.TButton',
     foreground=[('active', TEXT_COLOR)]
 )
 
+style.configure('Dark.TCombobox',
+    background=BUTTON_BG,
+    foreground=TEXT_COLOR,
+    arrowcolor=TEXT_COLOR,
+    relief='flat'
+)
+style.map('Dark.TCombobox',
+    fieldbackground=[('readonly', ENTRY_BG)],
+    foreground=[('readonly', TEXT_COLOR)]
+)
+
 # Set up the figure and axis with dark theme
 plt.style.use('dark_background')
 fig, ax = plt.subplots(figsize=(13,7))
@@ -184,11 +217,11 @@ def setup_cursor():
                 annot.set_visible(True)
             else:
                 annot.set_visible(False)
-            fig.canvas.draw_idle()
+            blit_manager.update()
 
     def on_leave(event):
         annot.set_visible(False)
-        fig.canvas.draw_idle()
+        blit_manager.update()
 
     # Connect events
     fig.canvas.mpl_connect('motion_notify_event', hover)
@@ -210,90 +243,116 @@ skin_depth_line, = ax.plot([], [], lw=2, color='yellow', linestyle='--', label='
 boundary_line, = ax.plot([], [], lw=2, color='white', linestyle='--', label='Boundary')  # Boundary line
 ax.legend()
 
-# Function to calculate wave parameters
+# The moving lines go through the decimator, which reduces them to the
+# min/max of each pixel column of the axes
+line_decimator = LineDecimator(ax)
+
+# Function to calculate wave parameters for the current slider values
 def calculate_wave_params():
-    omega = 2 * np.pi * freq
-    epsilon = epsilon_r * 8.854e-12  # Permittivity of the dielectric
-    mu = mu_r * 4 * np.pi * 1e-7  # Permeability of the dielectric
+    return wave_physics.calculate_wave_params(freq, epsilon_r, sigma, mu_r)
+
+# Spatial terms of the 2D fields for the current parameters; rebuilt by
+# update_params whenever the inputs change
+field_cache = None
+
+# Time-domain solver (FDTD grid or wideband pulse) when such an engine is
+# selected; restarted from the beginning whenever the inputs change
+time_engine = None
+time_solver = None
+
+# (generation, field_cache, time_solver), replaced as a whole so that the
+# frame producer thread always sees a consistent set
+frame_state = (0, None, None)
+
+# (generation, FrameRecorder) while the curves are recorded to disk; frames
+# are appended only for the generation the recording was started with
+recording = None
+
+# restore is a (info, arrays) snapshot from a session file to continue from
+# instead of starting over; it is ignored if it does not fit the solver
+#
+# Every generation gets a new solver: with --threaded-frames the producer may
+# still be stepping the previous one, which must not change under it.
+def build_time_solver(restore=None):
+    kind, waveform = time_engine
+    if kind == 'fdtd':
+        solver = FDTD1D(freq, amplitude, epsilon_r, sigma, mu_r, waveform=waveform)
+    else:
+        x = np.linspace(0, 5, WIDEBAND_X_POINTS)
+        solver = WidebandPulse(x[x <= 1], x[x > 1])
+    if restore is not None:
+        try:
+            solver.restore(*restore)
+            return solver
+        except (KeyError, ValueError):
+            pass
+    if kind == 'wideband':
+        solver.solve(freq, amplitude, epsilon_r, sigma, mu_r, waveform, material)
+    return solver
+
+def refresh_field_cache(restore=None):
+    global field_cache, time_solver, frame_state
+    # A recording holds one parameter set; new inputs end it
+    if recording is not None:
+        stop_recording()
+    field_cache = build_field_cache()
+    line_decimator.reset()
+    time_solver = None
+    if time_engine is not None and field_cache is not None:
+        time_solver = build_time_solver(restore)
+    frame_state = (frame_state[0] + 1, field_cache, time_solver)
+
+# x arrays of the curves (e_air, b_air, e_dielectric, b_dielectric)
+def curve_positions(cache, solver):
+    if solver is not None:
+        return solver.positions()
+    return cache.x_air, cache.x_air, cache.x_dielectric, cache.x_dielectric
+
+def build_field_cache():
+    params = calculate_wave_params()
+    if params is None or None in params:
+        return None
     
-    try:
-        # Complex permittivity
-        epsilon_complex = epsilon - 1j * sigma / omega
-        
-        # Complex wavenumber
-        k = -1.j * omega * np.sqrt(mu * epsilon_complex)
-        if k.real <= 0: 
-            k = -k  # Getting the root whose alpha is positive
-        
-        # Phase Constant
-        beta = k.imag #might be wrong
-        # Phase Velocity
-        v_p = omega/beta if beta != 0 else float('inf') #might be wrong
-        #eta
-        eta=1j*omega*mu/k
-        # Attenuation constant
-        alpha = k.real
-        
-        # Transition frequency
-        ft = sigma / (2 * np.pi * epsilon) if epsilon != 0 else float('inf')
-        
-        # Skin depth
-        skin_depth = 1 / alpha if alpha != 0 else float('inf')
-        
-        return omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p,eta
-        
-    except (ZeroDivisionError, ValueError):
-        return None, None, None, None, None, None, None, None
-
-# Initialize the wave
-def init():
-    e_line1.set_data([], [])
-    e_line2.set_data([], [])
-    b_line1.set_data([], [])
-    b_line2.set_data([], [])
-    e_line1.set_visible(True)
-    e_line2.set_visible(True)
-    b_line1.set_visible(True)
-    b_line2.set_visible(True)
-    return e_line1, e_line2, b_line1, b_line2, attenuation_line, skin_depth_line, boundary_line
+    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = params
+    # Sample points along the propagation direction, adapted to the wavelength
+    # and skin depth of each medium
+    x_air, x_dielectric = adaptive_grid(omega, beta, alpha)
+    cache = FieldCache(x_air, x_dielectric, amplitude, omega, beta, alpha, eta,
+                       frames_per_period=FRAMES_PER_PERIOD)
+    
+    # The static lines only change with the parameters
+    attenuation_line.set_data(cache.x_dielectric, cache.envelope)
+    skin_depth_line.set_data([1 + skin_depth, 1 + skin_depth], [-1.5, 1.5])
+    boundary_line.set_data([1, 1], [-1.5, 1.5])
+    return cache
 
 # Animation function
+@profiler.timed('animate')
 def animate(frame_number):
-    params = calculate_wave_params()
-    if params is None or None in params:
-        return e_line1, e_line2, b_line1, b_line2, attenuation_line, skin_depth_line, boundary_line
-    
-    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p,eta = params
-    x = np.linspace(0, 5, 1000)
-    time = frame_number * 1e-10  # Convert frame number to time (seconds)
-    
-    # Create a wave with constant amplitude from x=0 to x=1
-    beta_medium1 = np.sqrt(8.854e-12*4 * np.pi * 1e-7 )*omega
-    eta_medium1=376.73
-    y_e1 = amplitude * np.cos(omega * time - beta_medium1 * (x[x <= 1]-1))
-    y_b1 = 40*y_e1 / eta_medium1  # Calculate B-field for medium 1
-    
-    phase=omega * time - beta * (x[x > 1] - 1)
-    # Define attenuated amplitude starting from x=1
-    attenuated_amplitude = amplitude * np.exp(-alpha * (x[x >= 1] - 1))
-    k1=1/eta
-    # Create the second wave segment with continuity at x=1
-    y_e2 = attenuated_amplitude * np.cos(phase)
-    # Calculate B-field for lossy dielectric
-    y_b2 =40*( attenuated_amplitude * np.cos(phase)*k1.real + attenuated_amplitude * np.sin(phase)*k1.imag)
+    if field_cache is None:
+        return e_line1, e_line2, b_line1, b_line2
+    
+    if time_solver is not None:
+        # Advance the solver by the simulated time of one frame
+        time_solver.advance(1e-10, FDTD_MAX_STEPS_PER_FRAME)
+        time = time_solver.time
+        y_e1, y_b1, y_e2, y_b2 = time_solver.fields()
+    else:
+        time = frame_number * 1e-10  # Convert frame number to time (seconds)
+        y_e1, y_b1, y_e2, y_b2 = field_cache.fields(time)
+    x_e1, x_b1, x_e2, x_b2 = curve_positions(field_cache, time_solver)
+    if recording is not None:
+        recording[1].append(time, (y_e1, y_b1, y_e2, y_b2))
     
     # Update line data while preserving visibility
     current_e_visible = e_line1.get_visible()
     current_b_visible = b_line1.get_visible()
     
     # Update data for all lines
-    e_line1.set_data(x[x <= 1], y_e1)
-    e_line2.set_data(x[x > 1], y_e2)
-    b_line1.set_data(x[x <= 1], y_b1)
-    b_line2.set_data(x[x > 1], y_b2)
-    attenuation_line.set_data(x[x >= 1], attenuated_amplitude)
-    skin_depth_line.set_data([1 + skin_depth, 1 + skin_depth], [-1.5, 1.5])
-    boundary_line.set_data([1, 1], [-1.5, 1.5])
+    line_decimator.set_data(e_line1, x_e1, y_e1)
+    line_decimator.set_data(e_line2, x_e2, y_e2)
+    line_decimator.set_data(b_line1, x_b1, y_b1)
+    line_decimator.set_data(b_line2, x_b2, y_b2)
     
     # Restore visibility states
     e_line1.set_visible(current_e_visible)
@@ -301,10 +360,9 @@ def animate(frame_number):
     b_line1.set_visible(current_b_visible)
     b_line2.set_visible(current_b_visible)
     
-    return e_line1, e_line2, b_line1, b_line2, attenuation_line, skin_depth_line, boundary_line
+    return e_line1, e_line2, b_line1, b_line2
 
-# Create the animation 
-anim = FuncAnimation(fig, animate, init_func=init, frames=1000, interval=10, blit=False)
+refresh_field_cache()
 
 # Create main frame
 main_frame = tk.Frame(root, bg=DARK_BG)
@@ -318,6 +376,155 @@ plot_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
 canvas = FigureCanvasTkAgg(fig, master=plot_frame)
 canvas_widget = canvas.get_tk_widget()
 canvas_widget.pack(fill=tk.BOTH, expand=True)
+# The figure follows the widget size; decimate again for the new pixel width
+canvas_widget.bind("<Configure>", lambda event: line_decimator.refresh(), add="+")
+
+if profiler.enabled:
+    canvas.draw = profiler.wrap(canvas.draw, 'canvas draw (2D)')
+    
+    # Live timings drawn over the top-left corner of the plot
+    profile_overlay = tk.Label(plot_frame, bg=DARKER_BG, fg=ACCENT_COLOR, justify='left',
+                               anchor='nw', font=('Consolas', 9))
+    profile_overlay.place(x=8, y=8)
+    
+    def refresh_profile_overlay():
+        cache_lines = [f"cache {name}: {info.hits} hits, {info.misses} misses, {info.currsize}/{info.maxsize}"
+                       for name, info in wave_physics.cache_info().items()]
+        profile_overlay.config(text="\n".join([profiler.summary()] + cache_lines))
+        root.after(500, refresh_profile_overlay)
+    
+    refresh_profile_overlay()
+
+# Redraws only the animated artists on top of a cached background. The
+# background (axes, ticks, title, legend and the static lines) is captured
+# on every full draw, so code that changes static artists just calls
+# draw_idle() and the next frame blits onto the new background.
+class BlitManager:
+    def __init__(self, canvas, animated_artists=()):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        for artist in animated_artists:
+            self.add_artist(artist)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+    
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self.artists.append(artist)
+    
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        # Animated artists are skipped by full draws; put them back on top so
+        # they stay visible while the animation is paused
+        self.draw_artists()
+    
+    def draw_artists(self):
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
+    
+    @profiler.timed('blit')
+    def update(self):
+        if self.background is None:
+            # Nothing cached until the first full draw
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+blit_manager = BlitManager(canvas, [e_line1, e_line2, b_line1, b_line2, annot])
+
+# Drive the 2D animation from a canvas timer; each tick blits the moving lines
+frame_number = 0
+
+def advance_frame():
+    global frame_number
+    profiler.frame_tick('2D', 10)
+    animate(frame_number)
+    frame_number = (frame_number + 1) % 1000
+    blit_manager.update()
+
+anim_timer = canvas.new_timer(interval=10)
+anim_timer.add_callback(advance_frame)
+
+# With --threaded-frames the field values are computed by a producer thread
+# into a shared-memory ring buffer, and the Tk timer only draws the newest
+# finished frame; frames the Tk side is too slow for are never drawn, and
+# frames the producer is too slow for are skipped rather than queued.
+frame_ring = None
+frame_producer = None
+
+# Producer side: writes frame `frame` into out and returns (generation, lengths)
+@profiler.timed('compute_frame')
+def compute_frame(frame, elapsed, out):
+    generation, cache, solver = frame_state
+    if cache is None:
+        return None
+    if solver is not None:
+        solver.advance(elapsed * 1e-10, FDTD_MAX_STEPS_PER_FRAME)
+        time = solver.time
+        parts = solver.fields()
+        lengths = [len(part) for part in parts]
+        if sum(lengths) > len(out):
+            return None
+        np.concatenate(parts, out=out[:sum(lengths)])
+    else:
+        time = (frame % 1000) * 1e-10
+        parts = cache.fields(time, out=out)
+        lengths = [len(part) for part in parts]
+    # Every computed frame is recorded, also those the Tk side skips
+    current = recording
+    if current is not None and current[0] == generation:
+        current[1].append(time, (out[:sum(lengths)],))
+    return generation, lengths
+
+last_frame_seq = -1
+
+# Consumer side, on the Tk timer
+def consume_frame():
+    global last_frame_seq
+    profiler.frame_tick('2D', 10)
+    frame = frame_ring.latest()
+    generation, cache, solver = frame_state
+    if frame is None or frame.seq == last_frame_seq or frame.generation != generation:
+        return  # nothing new, or computed for parameters that have since changed
+    last_frame_seq = frame.seq
+    # Copy the slot first and use the copy only if the producer has not
+    # started overwriting the slot meanwhile; otherwise it may be torn
+    parts = [np.array(part) for part in frame.parts]
+    if not frame_ring.holds(frame):
+        return
+    positions = curve_positions(cache, solver)
+    for line, x, y in zip((e_line1, b_line1, e_line2, b_line2), positions, parts):
+        line_decimator.set_data(line, x, y)
+    blit_manager.update()
+
+# Starts and stops the producer together with the consumer timer, so the rest
+# of the GUI keeps using anim_timer as a plain timer
+class PipelineTimer:
+    def __init__(self, timer, producer):
+        self.timer = timer
+        self.producer = producer
+    
+    def start(self):
+        self.producer.resume()
+        self.timer.start()
+    
+    def stop(self):
+        self.timer.stop()
+        self.producer.pause()
+
+if cli_args.threaded_frames:
+    frame_ring = FrameRing(FRAME_RING_SLOTS, FRAME_RING_CAPACITY)
+    frame_producer = FrameProducer(frame_ring, compute_frame, interval_ms=10)
+    consumer_timer = canvas.new_timer(interval=10)
+    consumer_timer.add_callback(consume_frame)
+    anim_timer = PipelineTimer(consumer_timer, frame_producer)
+
+# Starts or resumes the 2D animation, plain or pipelined
+def start_2d_animation():
+    profiler.frame_reset('2D')
+    anim_timer.start()
 
 # Add developers section at the bottom of plot frame
 dev_frame = tk.Frame(plot_frame, bg=DARK_BG)
@@ -373,6 +580,8 @@ def reset_to_default():
     epsilon_slider.set(1.0)
     sigma_slider.set(np.log10(0.01))  # Default sigma in log scale
     mu_slider.set(1.0)
+    material_var.set(CUSTOM_MATERIAL)
+    select_material()
     
     # Reset field visibility
     e_line1.set_visible(True)
@@ -424,6 +633,9 @@ def create_slider_with_value(parent, label, from_, to, initial_value, row, preci
         value_entry.insert(0, f"{initial_value:.{precision}f}")
     
     def on_entry_change(event):
+        # Disabled while a library material supplies the value
+        if slider.instate(['disabled']):
+            return
         try:
             text = value_entry.get()
             if label.startswith("Frequency"):
@@ -458,6 +670,8 @@ def create_slider_with_value(parent, label, from_, to, initial_value, row, preci
                 value_entry.insert(0, f"{value:.{precision}f}")
     
     def on_slider_change(event):
+        if slider.instate(['disabled']):
+            return
         value = slider.get()
         value_entry.delete(0, tk.END)
         if label.startswith("Frequency"):
@@ -518,6 +732,9 @@ def create_log_slider_with_value(parent, label, from_, to, initial_value, row, p
         value_entry.insert(0, f"{initial_value:.{precision}f}")
     
     def on_entry_change(event):
+        # Disabled while a library material supplies the value
+        if slider.instate(['disabled']):
+            return
         try:
             text = value_entry.get()
             if label.startswith("Frequency"):
@@ -552,6 +769,8 @@ def create_log_slider_with_value(parent, label, from_, to, initial_value, row, p
                 value_entry.insert(0, f"{value:.{precision}f}")
     
     def on_slider_change(event):
+        if slider.instate(['disabled']):
+            return
         value = slider.get()
         value_entry.delete(0, tk.END)
         if label.startswith("Frequency"):
@@ -571,10 +790,10 @@ def create_log_slider_with_value(parent, label, from_, to, initial_value, row, p
 # Function to start/pause the animation
 def toggle_animation():
     if pause_button.config('text')[-1] == 'Pause':
-        anim.event_source.stop()
+        anim_timer.stop()
         pause_button.config(text='Start')
     else:
-        anim.event_source.start()
+        start_2d_animation()
         pause_button.config(text='Pause')
 
 
@@ -587,11 +806,168 @@ epsilon_slider, epsilon_value = create_slider_with_value(control_frame, "Relativ
 sigma_slider, sigma_value = create_log_slider_with_value(control_frame, "Conductivity (S/m)", 1e-5, 0.100001, sigma, 3, precision=5)
 mu_slider, mu_value = create_slider_with_value(control_frame, "Relative Permeability", 0.1, 2.0, mu_r, 4)
 
-# Create start/pause button
-pause_button = create_custom_button(control_frame, "Pause", toggle_animation)
-pause_button.grid(row=6, column=0, columnspan=3, pady=15)
+# Material selector: a library material replaces the permittivity and
+# conductivity sliders with values interpolated from its dispersion table
+# at the current frequency
+CUSTOM_MATERIAL = "Custom"
+tk.Label(control_frame, text="Material", bg=DARKER_BG, fg=TEXT_COLOR).grid(row=6, column=0, padx=5, pady=7, sticky="w")
+material_var = tk.StringVar(value=CUSTOM_MATERIAL)
+material_box = ttk.Combobox(control_frame, textvariable=material_var, values=[CUSTOM_MATERIAL] + list(MATERIALS),
+                            state='readonly', style='Dark.TCombobox')
+material_box.grid(row=6, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
+
+def select_material(*args):
+    global material
+    name = material_var.get()
+    material = material_table(name) if name in MATERIALS else None
+    state = ['disabled'] if material is not None else ['!disabled']
+    epsilon_slider.state(state)
+    sigma_slider.state(state)
+    entry_state = 'readonly' if material is not None else 'normal'
+    epsilon_value.config(state=entry_state, readonlybackground=ENTRY_BG)
+    sigma_value.config(state=entry_state, readonlybackground=ENTRY_BG)
+    if material is None:
+        # Back to the slider values
+        set_entry_text(epsilon_value, f"{epsilon_slider.get():.2f}")
+        set_entry_text(sigma_value, f"{sigma_slider.get():.5f}")
+    update_params()
 
+material_box.bind('<<ComboboxSelected>>', select_material)
 
+# Engine selector: the closed-form solution, the FDTD grid driven by one of
+# its incident waveforms, or a pulse synthesized from its spectrum
+tk.Label(control_frame, text="Engine", bg=DARKER_BG, fg=TEXT_COLOR).grid(row=7, column=0, padx=5, pady=7, sticky="w")
+engine_var = tk.StringVar(value="Analytic")
+engine_box = ttk.Combobox(control_frame, textvariable=engine_var, values=list(ENGINES),
+                          state='readonly', style='Dark.TCombobox')
+engine_box.grid(row=7, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
+
+def select_engine(*args):
+    global time_engine
+    time_engine = ENGINES[engine_var.get()]
+    refresh_field_cache()
+    # The producer thread steps the solver itself when it is running
+    if frame_producer is None:
+        animate(frame_number)
+    blit_manager.update()
+
+engine_box.bind('<<ComboboxSelected>>', select_engine)
+
+# Create start/pause button
+pause_button = create_custom_button(control_frame, "Pause", toggle_animation)
+pause_button.grid(row=8, column=0, columnspan=3, pady=15)
+
+
+
+# Sweep shown by the transition-frequency window: log-spaced points over the
+# chosen number of decades on each side of the transition frequency
+TRANSITION_SWEEP_POINTS = 10_000
+TRANSITION_SWEEP_DECADES = ("0.3", "0.5", "1", "2", "3")
+
+# Runs on the worker thread; only reads its arguments
+def transition_sweep(transition_freq, decades, epsilon_r, sigma, mu_r, material):
+    center = np.log10(transition_freq)
+    freq_range = np.logspace(center - decades, center + decades, TRANSITION_SWEEP_POINTS)
+    if material is not None:
+        epsilon_r, sigma = material(freq_range)
+    _, betas, alphas, _, _, _, _, _ = solve_wave_params(freq_range, epsilon_r, sigma, mu_r)
+    return freq_range, betas, alphas
+
+# Window with beta and alpha around the transition frequency. The figure is
+# built once and its lines are updated in place; the sweep runs on a worker
+# thread and the result is picked up by polling from the Tk loop, so wide
+# sweeps never block the GUI. A newer request supersedes a pending one.
+class TransitionAnalysis:
+    def __init__(self, root):
+        self.root = root
+        self.window = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+        self.transition_freq = None
+        self.material_inputs = None  # (epsilon_r, sigma, mu_r, material) the window was opened for
+    
+    def is_open(self):
+        return self.window is not None and self.window.winfo_exists()
+    
+    def build(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Complex Effects around Transition Frequency")
+        self.window.configure(bg=DARK_BG)
+        
+        controls = tk.Frame(self.window, bg=DARK_BG)
+        controls.pack(fill='x', padx=10, pady=5)
+        tk.Label(controls, text="Range (decades each side)", bg=DARK_BG, fg=TEXT_COLOR).pack(side='left')
+        self.decades_var = tk.StringVar(value="0.3")
+        decades_box = ttk.Combobox(controls, textvariable=self.decades_var, values=TRANSITION_SWEEP_DECADES,
+                                   width=5, state='readonly', style='Dark.TCombobox')
+        decades_box.pack(side='left', padx=5)
+        decades_box.bind('<<ComboboxSelected>>', self.run)
+        self.status = tk.Label(controls, text="", bg=DARK_BG, fg=ACCENT_COLOR)
+        self.status.pack(side='right')
+        
+        self.fig = Figure(figsize=(8, 10))
+        self.axs = self.fig.subplots(2, 1)
+        self.lines = []
+        self.markers = []
+        for ax_sweep, color, title, ylabel in (
+                (self.axs[0], "cyan", "Phase Shift per Distance (Beta) vs Frequency", "Beta (rad/m)"),
+                (self.axs[1], "magenta", "Attenuation per Distance (Alpha) vs Frequency", "Alpha (Np/m)")):
+            line, = ax_sweep.plot([], [], color=color)
+            ax_sweep.set_xscale('log')
+            marker = ax_sweep.axvline(1, color="red", linestyle="--", label="Transition Frequency")
+            ax_sweep.legend()
+            ax_sweep.set_title(title)
+            ax_sweep.set_ylabel(ylabel)
+            self.lines.append(line)
+            self.markers.append(marker)
+        self.fig.tight_layout()
+        
+        # Embed the plot into the window
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    
+    def show(self, transition_freq):
+        if not self.is_open():
+            self.build()
+        self.window.lift()
+        # Kept with the transition frequency, so that a new range sweeps the
+        # same parameter set
+        self.transition_freq = transition_freq
+        self.material_inputs = (epsilon_r, sigma, mu_r, material)
+        self.run()
+    
+    def run(self, *args):
+        if self.future is not None:
+            self.future.cancel()
+        self.status.config(text="Computing...")
+        self.future = self.executor.submit(transition_sweep, self.transition_freq, float(self.decades_var.get()),
+                                           *self.material_inputs)
+        self.poll(self.future)
+    
+    def poll(self, future):
+        if future is not self.future or not self.is_open():
+            return
+        if not future.done():
+            self.root.after(20, self.poll, future)
+            return
+        self.status.config(text="")
+        try:
+            freq_range, betas, alphas = future.result()
+        except Exception as error:
+            messagebox.showerror("Error", f"The transition sweep failed: {error}", parent=self.window)
+            return
+        for ax_sweep, line, marker, values in zip(self.axs, self.lines, self.markers, (betas, alphas)):
+            line.set_data(freq_range, values)
+            marker.set_xdata([self.transition_freq, self.transition_freq])
+            ax_sweep.set_xlabel(f"Frequency ({format_frequency(freq)})")
+            ax_sweep.relim()
+            ax_sweep.autoscale_view()
+        self.canvas.draw_idle()
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+transition_analysis = TransitionAnalysis(root)
 
 def show_transition_frequency_complex_effects():
     transition_freq = calculate_wave_params()[4]
@@ -605,53 +981,7 @@ def show_transition_frequency_complex_effects():
         messagebox.showerror("Error", "Transition frequency is too high; cannot plot graphs.")
         return
     
-    # Frequency range around the transition frequency
-    freq_range = np.linspace(transition_freq * 0.5, transition_freq * 2, 200)
-
-    # Initialize arrays for storing real and imaginary parts of the wavenumber (beta and alpha)
-    betas = []
-    alphas = []
-
-    for f in freq_range:
-        global freq
-        freq = f
-        _, beta, alpha, _, _, _, _,_ = calculate_wave_params()
-        
-        betas.append(beta)  # Phase shift per distance
-        alphas.append(alpha)  # Attenuation per distance
-
-    # Plot the results in a new window with vertical lines marking transition frequency
-    if not hasattr(show_transition_frequency_complex_effects, 'window') or not show_transition_frequency_complex_effects.window.winfo_exists():
-        show_transition_frequency_complex_effects.window = tk.Toplevel(root)
-    new_window = show_transition_frequency_complex_effects.window
-    new_window.title("Complex Effects around Transition Frequency")
-    
-    fig, axs = plt.subplots(2, 1, figsize=(8, 10))
-    
-    # Plot beta (phase shift per distance) vs Frequency
-    axs[0].plot(freq_range, betas, color="cyan")
-    axs[0].set_xscale('log')
-    axs[0].axvline(transition_freq, color="red", linestyle="--", label="Transition Frequency")
-    axs[0].legend()
-    axs[0].set_title("Phase Shift per Distance (Beta) vs Frequency")
-    axs[0].set_xlabel(f"Frequency ({format_frequency(freq)})")
-    axs[0].set_ylabel("Beta (rad/m)")
-
-    # Plot alpha (attenuation per distance) vs Frequency
-    axs[1].plot(freq_range, alphas, color="magenta")
-    axs[1].set_xscale('log')
-    axs[1].axvline(transition_freq, color="red", linestyle="--", label="Transition Frequency")
-    axs[1].legend()
-    axs[1].set_title("Attenuation per Distance (Alpha) vs Frequency")
-    axs[1].set_xlabel(f"Frequency ({format_frequency(freq)})")
-    axs[1].set_ylabel("Alpha (Np/m)")
-
-
-    fig.tight_layout()
-    # Embed the plot into the new Tkinter window
-    canvas = FigureCanvasTkAgg(fig, master=new_window)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    transition_analysis.show(transition_freq)
 
 # Add button to control frame for new complex effect plots
 complex_effects_button = create_custom_button(
@@ -659,7 +989,7 @@ complex_effects_button = create_custom_button(
     "Show Complex Effects Around Transition Frequency", 
     show_transition_frequency_complex_effects
 )
-complex_effects_button.grid(row=7, column=0, columnspan=3, pady=10)
+complex_effects_button.grid(row=9, column=0, columnspan=3, pady=10)
 
 
 def set_to_transition_frequency():
@@ -688,7 +1018,7 @@ set_transition_freq_button = create_custom_button(
     "Set to Transition Frequency", 
     set_to_transition_frequency
 )
-set_transition_freq_button.grid(row=8, column=0, columnspan=3, pady=10)
+set_transition_freq_button.grid(row=10, column=0, columnspan=3, pady=10)
 
 
 # Function to toggle E-field visibility and button state
@@ -734,6 +1064,7 @@ def show_b_field():
     fig.canvas.draw_idle()
 
 # Function to update the legend based on line visibility
+@profiler.timed('update_legend')
 def update_legend():
     # Remove existing legend
     if ax.get_legend():
@@ -771,26 +1102,25 @@ def update_legend():
     
 # Create buttons to show E-field and B-field
 e_field_button = create_custom_button(control_frame, "Show E-field", show_e_field)
-e_field_button.grid(row=9, column=0, padx=(20, 5), pady=10, sticky="ew")
+e_field_button.grid(row=11, column=0, padx=(20, 5), pady=10, sticky="ew")
 e_field_button.config(bg=BUTTON_ACTIVE_BG, fg=DARKER_BG, relief='sunken')
 
 
 b_field_button = create_custom_button(control_frame, "Show B-field", show_b_field)
-b_field_button.grid(row=9, column=2, padx=5, pady=10, sticky="ew")
+b_field_button.grid(row=11, column=2, padx=5, pady=10, sticky="ew")
 b_field_button.config(bg=BUTTON_ACTIVE_BG, fg=DARKER_BG, relief='sunken')
 
 # Add 3D plot button
 def show_3d_plot():
     # Pause 2D animation
-    anim.event_source.stop()
+    anim_timer.stop()
     pause_button.config(text='Start')
     
-    # Check if window already exists and destroy it if it does
+    # Reuse the scene if the window is already open
     if hasattr(show_3d_plot, 'window') and show_3d_plot.window.winfo_exists():
-        # Stop animation if it exists
-        if hasattr(show_3d_plot, 'anim_3d') and show_3d_plot.anim_3d and show_3d_plot.anim_3d.event_source:
-            show_3d_plot.anim_3d.event_source.stop()
-        show_3d_plot.window.destroy()
+        show_3d_plot.window.lift()
+        update_3d_plot()
+        return
     
     # Create new window for 3D plot
     show_3d_plot.window = tk.Toplevel(root)
@@ -799,41 +1129,38 @@ def show_3d_plot():
     plot_window.attributes('-topmost', True)
     
     # Store figure and axis references
-    show_3d_plot.fig_3d = plt.figure(figsize=(10, 8))
+    show_3d_plot.fig_3d = Figure(figsize=(10, 8))
     show_3d_plot.ax_3d = show_3d_plot.fig_3d.add_subplot(111, projection='3d')
     
     # Create canvas first
     show_3d_plot.canvas_3d = FigureCanvasTkAgg(show_3d_plot.fig_3d, master=plot_window)
     show_3d_plot.canvas_3d.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    if profiler.enabled:
+        show_3d_plot.canvas_3d.draw = profiler.wrap(show_3d_plot.canvas_3d.draw, 'canvas draw (3D)')
     
-    # Now do the initial plot setup
+    # Build the persistent scene, then fill it with the current parameters
+    show_3d_plot.frame_3d = 0
+    build_3d_scene()
     update_3d_plot()
     
+    # One long-lived animation for the lifetime of the window
+    show_3d_plot.timer_3d = show_3d_plot.canvas_3d.new_timer(interval=20)
+    show_3d_plot.timer_3d.add_callback(advance_3d_frame)
+    profiler.frame_reset('3D')
+    show_3d_plot.timer_3d.start()
+    
     def on_close():
-        if hasattr(show_3d_plot, 'anim_3d') and show_3d_plot.anim_3d and show_3d_plot.anim_3d.event_source:
-            show_3d_plot.anim_3d.event_source.stop()
+        show_3d_plot.timer_3d.stop()
         plot_window.destroy()
         # Resume 2D animation when 3D window is closed
-        anim.event_source.start()
+        start_2d_animation()
         pause_button.config(text='Pause')
     
     plot_window.protocol("WM_DELETE_WINDOW", on_close)
 
-def update_3d_plot():
-    if not (hasattr(show_3d_plot, 'window') and show_3d_plot.window.winfo_exists()):
-        return
-        
+# Create the artists of the 3D scene once; parameter changes only update their data
+def build_3d_scene():
     ax_3d = show_3d_plot.ax_3d
-    ax_3d.clear()  # Clear existing plot
-    
-    # Get current wave parameters
-    params = calculate_wave_params()
-    if params is None or None in params:
-        return
-    
-    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = params
-    beta_medium1 = np.sqrt(8.854e-12 * 4 * np.pi * 1e-7) * omega
-    eta_medium1 = 376.73
     
     # Create boundary plane
     xx, zz = np.meshgrid(np.linspace(-3, 3, 10), np.linspace(-3, 3, 10))
@@ -842,20 +1169,10 @@ def update_3d_plot():
                       edgecolor='white', linewidth=0.5)
     
     # Create static elements
-    att_x = np.linspace(1, 5, 100)
-    att_amp = amplitude * np.exp(-alpha * (att_x - 1))
-    ax_3d.plot(att_x, np.zeros_like(att_x), att_amp, 'magenta', 
+    show_3d_plot.attenuation_line_3d, = ax_3d.plot([], [], [], 'magenta', 
               label='Attenuated Amplitude', linestyle='--', linewidth=2)
-    
-    if not np.isinf(skin_depth):
-        sd_x = np.array([1 + skin_depth, 1 + skin_depth])
-        sd_y = np.array([-1.5, 1.5])
-        sd_z = np.array([-1.5, 1.5])
-        ax_3d.plot(sd_x, sd_y, sd_z, 'yellow', linestyle='--', 
-                  label='Skin Depth', linewidth=2)
-    
-    x1 = np.linspace(0, 1, 100)
-    x2 = np.linspace(1, 5, 100)
+    show_3d_plot.skin_depth_line_3d, = ax_3d.plot([], [], [], 'yellow', linestyle='--', 
+              label='Skin Depth', linewidth=2)
     
     # Initialize lines with empty data
     show_3d_plot.e_line1_3d, = ax_3d.plot([], [], [], color='cyan', label='E-field (Air)', linewidth=2)
@@ -863,45 +1180,10 @@ def update_3d_plot():
     show_3d_plot.b_line1_3d, = ax_3d.plot([], [], [], color='green', label='B-field (Air)', linewidth=2)
     show_3d_plot.b_line2_3d, = ax_3d.plot([], [], [], color='red', label='B-field (Lossy Dielectric)', linewidth=2)
     
-    # Set initial visibility based on 2D plot
-    show_3d_plot.e_line1_3d.set_visible(e_line1.get_visible())
-    show_3d_plot.e_line2_3d.set_visible(e_line2.get_visible())
-    show_3d_plot.b_line1_3d.set_visible(b_line1.get_visible())
-    show_3d_plot.b_line2_3d.set_visible(b_line2.get_visible())
-
-    def update_3d(frame):
-        time = frame *3e-9 # Remove the multiplication factor to make animation smoother
-        
-        # Calculate wave values for both E and B fields
-        z1 = amplitude * np.cos(omega * time - beta_medium1 * (x1 - 1))
-        phase = omega * time - beta * (x2 - 1)
-        attenuated_amplitude = amplitude * np.exp(-alpha * (x2 - 1))
-        z2 = attenuated_amplitude * np.cos(phase)
-        
-        y1 = 40 * amplitude * np.cos(omega * time - beta_medium1 * (x1 - 1)) / eta_medium1
-        k1 = 1/eta
-        y2 = 40 * (attenuated_amplitude * np.cos(phase)*k1.real + attenuated_amplitude * np.sin(phase)*k1.imag)
-        
-        # Update E-field lines if visible
-        show_3d_plot.e_line1_3d.set_data(x1, np.zeros_like(x1))
-        show_3d_plot.e_line1_3d.set_3d_properties(z1)
-        show_3d_plot.e_line2_3d.set_data(x2, np.zeros_like(x2))
-        show_3d_plot.e_line2_3d.set_3d_properties(z2)
-        
-        # Update B-field lines if visible
-        show_3d_plot.b_line1_3d.set_data(x1, y1)
-        show_3d_plot.b_line1_3d.set_3d_properties(np.zeros_like(x1))
-        show_3d_plot.b_line2_3d.set_data(x2, y2)
-        show_3d_plot.b_line2_3d.set_3d_properties(np.zeros_like(x2))
-        
-        return [show_3d_plot.e_line1_3d, show_3d_plot.e_line2_3d, 
-                show_3d_plot.b_line1_3d, show_3d_plot.b_line2_3d]
-    
     # Set up the plot appearance
     ax_3d.set_xlabel('X (Distance)')
     ax_3d.set_ylabel('Y (B-field)')
     ax_3d.set_zlabel('Z (E-field)')
-    ax_3d.set_title(f'3D Electromagnetic Wave (f={format_frequency(freq)})')
     
     ax_3d.set_box_aspect([4, 2, 2])
     ax_3d.view_init(elev=30, azim=-120)
@@ -911,37 +1193,200 @@ def update_3d_plot():
     ax_3d.grid(True, linestyle='--', alpha=0.3)
     ax_3d.legend(loc='upper right')
     
-    # Stop existing animation if it exists
-    if hasattr(show_3d_plot, 'anim_3d') and show_3d_plot.anim_3d is not None:
-        if hasattr(show_3d_plot.anim_3d, 'event_source') and show_3d_plot.anim_3d.event_source is not None:
-            show_3d_plot.anim_3d.event_source.stop()
-    
-    # Create new animation
-    show_3d_plot.anim_3d = FuncAnimation(
-        show_3d_plot.fig_3d,
-        update_3d,
-        frames=np.linspace(0, 2*np.pi, 100),  # Reduced number of frames
-        interval=20,  # Shorter interval for smoother animation
-        blit=True,
-        repeat=True  # Ensure continuous looping
-    )
+    # Only the field lines are redrawn per frame
+    show_3d_plot.blit_3d = BlitManager(show_3d_plot.canvas_3d, [
+        show_3d_plot.e_line1_3d, show_3d_plot.e_line2_3d,
+        show_3d_plot.b_line1_3d, show_3d_plot.b_line2_3d,
+    ])
+    show_3d_plot.cache_3d = None
+
+def update_3d_plot():
+    if not (hasattr(show_3d_plot, 'window') and show_3d_plot.window.winfo_exists()):
+        return
+    
+    # Get current wave parameters
+    params = calculate_wave_params()
+    if params is None or None in params:
+        return
+    
+    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = params
     
+    x1, x2 = adaptive_grid(omega, beta, alpha, max_points=MAX_SEGMENT_POINTS_3D)
+    show_3d_plot.cache_3d = FieldCache(x1, x2, amplitude, omega, beta, alpha, eta,
+                                       frames_per_period=FRAMES_PER_PERIOD)
+    show_3d_plot.zeros_air = np.zeros_like(x1)
+    show_3d_plot.zeros_dielectric = np.zeros_like(x2)
     
-    if hasattr(show_3d_plot, 'canvas_3d'):
-        show_3d_plot.canvas_3d.draw()
+    # Update static elements
+    att_amp = show_3d_plot.cache_3d.envelope
+    show_3d_plot.attenuation_line_3d.set_data(x2, np.zeros_like(x2))
+    show_3d_plot.attenuation_line_3d.set_3d_properties(att_amp)
+    
+    show_3d_plot.skin_depth_line_3d.set_visible(not np.isinf(skin_depth))
+    if not np.isinf(skin_depth):
+        show_3d_plot.skin_depth_line_3d.set_data([1 + skin_depth, 1 + skin_depth], [-1.5, 1.5])
+        show_3d_plot.skin_depth_line_3d.set_3d_properties([-1.5, 1.5])
+    
+    show_3d_plot.ax_3d.set_title(f'3D Electromagnetic Wave (f={format_frequency(freq)})')
+    
+    # Match visibility to the 2D plot
+    show_3d_plot.e_line1_3d.set_visible(e_line1.get_visible())
+    show_3d_plot.e_line2_3d.set_visible(e_line2.get_visible())
+    show_3d_plot.b_line1_3d.set_visible(b_line1.get_visible())
+    show_3d_plot.b_line2_3d.set_visible(b_line2.get_visible())
+    
+    update_3d(2 * np.pi * show_3d_plot.frame_3d / 99)
+    
+    # Redraw the background with the new static elements
+    show_3d_plot.canvas_3d.draw_idle()
+
+@profiler.timed('update_3d')
+def update_3d(frame):
+    time = frame *3e-9 # Remove the multiplication factor to make animation smoother
+    
+    # Calculate wave values for both E and B fields
+    x1 = show_3d_plot.cache_3d.x_air
+    x2 = show_3d_plot.cache_3d.x_dielectric
+    z1, y1, z2, y2 = show_3d_plot.cache_3d.fields(time)
+    
+    # Update E-field lines if visible
+    show_3d_plot.e_line1_3d.set_data(x1, show_3d_plot.zeros_air)
+    show_3d_plot.e_line1_3d.set_3d_properties(z1)
+    show_3d_plot.e_line2_3d.set_data(x2, show_3d_plot.zeros_dielectric)
+    show_3d_plot.e_line2_3d.set_3d_properties(z2)
+    
+    # Update B-field lines if visible
+    show_3d_plot.b_line1_3d.set_data(x1, y1)
+    show_3d_plot.b_line1_3d.set_3d_properties(show_3d_plot.zeros_air)
+    show_3d_plot.b_line2_3d.set_data(x2, y2)
+    show_3d_plot.b_line2_3d.set_3d_properties(show_3d_plot.zeros_dielectric)
+    
+    return [show_3d_plot.e_line1_3d, show_3d_plot.e_line2_3d, 
+            show_3d_plot.b_line1_3d, show_3d_plot.b_line2_3d]
+
+# 100 frames spread over 0..2*pi, looping
+def advance_3d_frame():
+    profiler.frame_tick('3D', 20)
+    update_3d(2 * np.pi * show_3d_plot.frame_3d / 99)
+    show_3d_plot.frame_3d = (show_3d_plot.frame_3d + 1) % 100
+    show_3d_plot.blit_3d.update()
 
 # Update the button creation 
 plot_3d_button = create_custom_button(control_frame, "Show 3D Plot", show_3d_plot)
-plot_3d_button.grid(row=9, column=1, pady=10, sticky="ew")
+plot_3d_button.grid(row=11, column=1, pady=10, sticky="ew")
+
+
+# Field map: pixels per side and frames per period of the animation
+FIELD_MAP_SIZE = 512
+FIELD_MAP_FRAMES_PER_PERIOD = 60
+
+# Window with the field over the x-z plane around the boundary, for a plane
+# wave at an adjustable angle of incidence (oblique.py). The phasor grid is
+# rebuilt only when the inputs change; each frame rotates it and blits the
+# image over the cached axes, colorbar and boundary.
+class FieldMapWindow:
+    def __init__(self, root):
+        self.root = root
+        self.window = None
+        self.field_map = None
+        self.frame = 0
+    
+    def is_open(self):
+        return self.window is not None and self.window.winfo_exists()
+    
+    def build(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Field Map (x-z Plane)")
+        self.window.configure(bg=DARK_BG)
+        
+        controls = tk.Frame(self.window, bg=DARK_BG)
+        controls.pack(fill='x', padx=10, pady=5)
+        tk.Label(controls, text="Angle of incidence", bg=DARK_BG, fg=TEXT_COLOR).pack(side='left')
+        self.angle_slider = ttk.Scale(controls, from_=0, to=89, orient="horizontal", length=200,
+                                      style='Dark.Horizontal.TScale', command=self.update)
+        self.angle_slider.pack(side='left', padx=5)
+        self.angle_label = tk.Label(controls, text="0°", width=4, bg=DARK_BG, fg=ACCENT_COLOR)
+        self.angle_label.pack(side='left')
+        tk.Label(controls, text="Polarization", bg=DARK_BG, fg=TEXT_COLOR).pack(side='left', padx=(20, 0))
+        self.polarization_var = tk.StringVar(value="TE")
+        polarization_box = ttk.Combobox(controls, textvariable=self.polarization_var, values=("TE", "TM"),
+                                        width=4, state='readonly', style='Dark.TCombobox')
+        polarization_box.pack(side='left', padx=5)
+        polarization_box.bind('<<ComboboxSelected>>', self.update)
+        
+        self.fig = Figure(figsize=(9, 7))
+        self.ax = self.fig.add_subplot(111)
+        self.image = self.ax.imshow(np.zeros((FIELD_MAP_SIZE, FIELD_MAP_SIZE), dtype=np.float32),
+                                    extent=(0, 5, -2.5, 2.5), origin='lower', cmap='RdBu_r',
+                                    interpolation='nearest', aspect='auto')
+        self.ax.axvline(wave_physics.BOUNDARY_X, color='black', linestyle='--', lw=1)
+        self.colorbar = self.fig.colorbar(self.image, ax=self.ax)
+        self.ax.set_xlabel("x (m)")
+        self.ax.set_ylabel("z (m)")
+        
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.blit = BlitManager(self.canvas, [self.image])
+        
+        self.timer = self.canvas.new_timer(interval=30)
+        self.timer.add_callback(self.advance)
+        profiler.frame_reset('field map')
+        self.timer.start()
+        
+        def on_close():
+            self.timer.stop()
+            self.window.destroy()
+            self.field_map = None
+        
+        self.window.protocol("WM_DELETE_WINDOW", on_close)
+    
+    def show(self):
+        if not self.is_open():
+            self.build()
+        self.window.lift()
+        self.update()
+    
+    # Rebuilds the phasor grid for the current inputs, angle and polarization
+    def update(self, *args):
+        if not self.is_open():
+            return
+        params = calculate_wave_params()
+        if params is None or None in params:
+            return
+        angle = float(self.angle_slider.get())
+        polarization = self.polarization_var.get()
+        self.angle_label.config(text=f"{angle:.0f}°")
+        self.field_map = FieldMap(ObliqueBoundary(epsilon_r, sigma, mu_r), freq, np.radians(angle), amplitude,
+                                  polarization, shape=(FIELD_MAP_SIZE, FIELD_MAP_SIZE))
+        self.image.set_clim(-self.field_map.peak, self.field_map.peak)
+        self.colorbar.set_label("E_y" if polarization == "TE" else "η0·H_y")
+        self.ax.set_title(f"{polarization} wave at {angle:.0f}° (f={format_frequency(freq)})")
+        self.advance()
+        # Redraw the background with the new title and color scale
+        self.canvas.draw_idle()
+    
+    def advance(self):
+        if self.field_map is None:
+            return
+        profiler.frame_tick('field map', 30)
+        phase = 2 * np.pi * self.frame / FIELD_MAP_FRAMES_PER_PERIOD
+        self.image.set_data(self.field_map.frame(phase / self.field_map.omega))
+        self.frame = (self.frame + 1) % FIELD_MAP_FRAMES_PER_PERIOD
+        self.blit.update()
+
+field_map_window = FieldMapWindow(root)
+
+field_map_button = create_custom_button(control_frame, "Show Field Map (x-z Plane)", field_map_window.show)
+field_map_button.grid(row=12, column=0, columnspan=3, pady=10)
 
 # Create a canvas and scrollbar for scrolling
 value_canvas = tk.Canvas(control_frame, bg=DARKER_BG, highlightthickness=0)
-value_canvas.grid(row=10, column=0, columnspan=3, pady=(20,10), sticky="nsew")  # Reduced bottom padding
+value_canvas.grid(row=13, column=0, columnspan=3, pady=(20,10), sticky="nsew")  # Reduced bottom padding
 
 
 # Add scrollbar
 value_scrollbar = ttk.Scrollbar(control_frame, orient="vertical", command=value_canvas.yview)
-value_scrollbar.grid(row=10, column=3, sticky="ns")
+value_scrollbar.grid(row=13, column=3, sticky="ns")
 
 # Configure canvas
 value_canvas.configure(yscrollcommand=value_scrollbar.set)
@@ -969,7 +1414,7 @@ value_frame.bind("<Configure>", update_scroll_region)
 value_canvas.configure(height=2)  # Adjust this value as needed
 
 # Configure grid weights for the control frame
-control_frame.grid_rowconfigure(10, weight=1)
+control_frame.grid_rowconfigure(13, weight=1)
 control_frame.grid_columnconfigure(0, weight=1)
 
 # Create labels for names and values
@@ -1041,16 +1486,63 @@ smooth_scroll = SmoothScroll(value_canvas)
 # Bind mouse wheel to smooth scroll
 value_canvas.bind_all("<MouseWheel>", smooth_scroll.on_mousewheel)
 
-# Update all wave parameters and displays
+# Coalesces bursts of slider and entry events into at most one parameter
+# update per display frame, and skips the update entirely when the inputs
+# read from the widgets are the same as last time. While an entry holds text
+# that is not a number (e.g. half typed), the last good inputs stay applied.
+class UpdateScheduler:
+    def __init__(self, widget, read_inputs, apply, delay=16):
+        self.widget = widget
+        self.read_inputs = read_inputs
+        self.apply = apply
+        self.delay = delay  # ms, about one frame at 60 Hz
+        self.pending = None
+        self.last_inputs = None
+    
+    def request(self, *args):
+        if self.pending is None:
+            self.pending = self.widget.after(self.delay, self.flush)
+    
+    def flush(self):
+        self.pending = None
+        try:
+            inputs = self.read_inputs()
+        except ValueError:
+            return
+        if inputs == self.last_inputs:
+            return
+        self.last_inputs = inputs
+        self.apply(inputs)
+
+# Effective inputs as (freq, amplitude, epsilon_r, sigma, mu_r); with a library
+# material, epsilon_r and sigma come from its table at the slider frequency
+def read_inputs():
+    frequency = freq_slider.get()
+    if material is None:
+        epsilon_input, sigma_input = epsilon_slider.get(), float(sigma_value.get())
+    else:
+        epsilon_input, sigma_input = (value.item() for value in material(frequency))
+    return (
+        frequency,
+        float(amp_value.get()),
+        epsilon_input,
+        sigma_input,
+        mu_slider.get(),
+    )
+
+# Update all wave parameters and displays; slider and entry events go
+# through the scheduler, so this runs at most once per frame
+@profiler.timed('update_params')
 def update_params(*args):
+    update_scheduler.request()
+
+@profiler.timed('apply_params')
+def apply_params(inputs, restore=None):
     global freq, amplitude, epsilon_r, sigma, mu_r
     
     # Get current values from sliders
-    freq = freq_slider.get()
-    amplitude = float(amp_value.get())
-    epsilon_r = epsilon_slider.get()
-    sigma = float(sigma_value.get())
-    mu_r = mu_slider.get()
+    freq, amplitude, epsilon_r, sigma, mu_r = inputs
+    refresh_field_cache(restore)
     
     # Update plot title and labels
     ax.set_title(f"Electromagnetic Wave in Lossy Dielectric (f={format_frequency(freq)})", 
@@ -1062,10 +1554,13 @@ def update_params(*args):
     # Update 3D visualization if active
     if hasattr(show_3d_plot, 'window') and show_3d_plot.window.winfo_exists():
         update_3d_plot()
+    field_map_window.update()
     
     fig.canvas.draw_idle()
     update_param_display()
 
+update_scheduler = UpdateScheduler(root, read_inputs, apply_params)
+
 # Make sure the sliders are bound to update_params
 freq_slider.config(command=update_params)
 amp_slider.config(command=update_params)
@@ -1073,61 +1568,294 @@ epsilon_slider.config(command=update_params)
 sigma_slider.config(command=update_params)
 mu_slider.config(command=update_params)
 
+# Replaces the text of an entry, even a read-only one
+def set_entry_text(entry, text):
+    state = entry.cget('state')
+    entry.config(state='normal')
+    entry.delete(0, tk.END)
+    entry.insert(0, text)
+    entry.config(state=state)
+
 # Function to update parameter display
+@profiler.timed('update_param_display')
 def update_param_display():
     # Update slider value displays
     freq_value.delete(0, tk.END)
     freq_value.insert(0, format_frequency(freq))
     amp_value.delete(0, tk.END)
     amp_value.insert(0, f"{amplitude:.2f}")
-    epsilon_value.delete(0, tk.END)
-    epsilon_value.insert(0, f"{epsilon_r:.2f}")
-    sigma_value.delete(0, tk.END)
-    sigma_value.insert(0, f"{sigma:.5f}")
+    set_entry_text(epsilon_value, f"{epsilon_r:.2f}")
+    set_entry_text(sigma_value, f"{sigma:.5f}")
     mu_value.delete(0, tk.END)
     mu_value.insert(0, f"{mu_r:.2f}")
     
     # Calculate and display new parameters
-    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p,eta = calculate_wave_params()
-    
-    # Calculate complex propagation constant (gamma)
-    gamma = alpha + 1j * beta
-    wavelength = 2 * np.pi / beta
+    for name, text in describe_wave(freq, amplitude, epsilon_r, sigma, mu_r).items():
+        value_labels[name].config(text=text)
 
-    k1=1/eta
-    # Calculate phase difference
-    
-    phase_difference = np.arctan2(k1.imag, k1.real)
-    phase_difference_degrees = np.degrees(phase_difference)
-
-    
-    b_magnitude = amplitude / abs(eta)
-    b_magnitude_text = format_scientific(b_magnitude, 3) + " T"
-    
-    
-    # Update B-field magnitude display
-    value_labels["B-field Magnitude"].config(text=b_magnitude_text + " (Increased 40 times for \nbetter visibility)")
-    
-    # Update all parameter displays
-    value_labels["Transition Frequency"].config(text=format_frequency(ft))
-    value_labels["Behavior"].config(text='Dielectric' if freq > ft else 'Conductor')
-    value_labels["Skin Depth"].config(text="∞ m" if np.isinf(skin_depth) else format_distance(skin_depth, 3))
-    value_labels["Phase Velocity"].config(text="∞ m/s" if np.isinf(v_p) else format_scientific(v_p, 3) + " m/s")
-    value_labels["Complex ε"].config(text=format_scientific(epsilon_complex, 3))
-    value_labels["Propagation constant(γ)"].config(text=format_scientific(gamma, 3) + " m⁻¹")
-    value_labels["Attenuation constant(α)"].config(text=format_scientific(alpha, 3) + " Np/m")
-    value_labels["Phase constant(β)"].config(text=format_scientific(beta, 3) + " rad/m")
-    value_labels["Wavelength(λ)"].config(text=format_distance(wavelength, 3))
-    value_labels["Intrinsic Impedance(η)"].config(text=f"{eta:.2f}" + " Ω")
-    value_labels["E-B Phase Difference"].config( text=f"{phase_difference_degrees:.2f}° ({phase_difference:.2f} rad)")
+# Initial parameter display
+update_param_display()
 
-    
+# Sessions: the inputs, view settings and the arrays that are costly to
+# rebuild (the running FDTD grid or the synthesized wideband pulse) saved to
+# a session file (session.py), whose arrays are memory-mapped on loading.
+# The analytic field cache is not saved; it is cheap to rebuild.
+def session_snapshot():
+    # The applied inputs, not the widgets, which may hold half-typed text
+    state = {
+        'freq': float(freq),
+        'amplitude': float(amplitude),
+        'epsilon_r': float(epsilon_r),
+        'sigma': float(sigma),
+        'mu_r': float(mu_r),
+        'material': material_var.get(),
+        'engine': engine_var.get(),
+        'e_visible': bool(e_line1.get_visible()),
+        'b_visible': bool(b_line1.get_visible()),
+        'paused': pause_button.config('text')[-1] == 'Start',
+        'frame_number': frame_number,
+    }
+    arrays = {}
+    if time_solver is not None:
+        # The producer thread steps the solver; copy its state between frames
+        with frame_producer.hold() if frame_producer is not None else contextlib.nullcontext():
+            info, solver_arrays = time_solver.snapshot()
+            solver_arrays = {name: np.array(array) for name, array in solver_arrays.items()}
+        state['time_solver'] = info
+        arrays.update({'solver_' + name: array for name, array in solver_arrays.items()})
+    if hasattr(show_3d_plot, 'window') and show_3d_plot.window.winfo_exists():
+        state['view_3d'] = {'elev': float(show_3d_plot.ax_3d.elev), 'azim': float(show_3d_plot.ax_3d.azim),
+                            'frame': show_3d_plot.frame_3d}
+    if field_map_window.is_open():
+        state['field_map'] = {'angle': float(field_map_window.angle_slider.get()),
+                              'polarization': field_map_window.polarization_var.get()}
+    return state, arrays
+
+def apply_session(state, arrays):
+    global time_engine, frame_number
+    # The material first: it enables or disables the permittivity and
+    # conductivity sliders, and a disabled ttk.Scale ignores set()
+    material_var.set(state['material'])
+    select_material()
+    freq_slider.set(np.log10(state['freq']))
+    set_entry_text(freq_value, format_frequency(state['freq']))
+    amp_slider.set(state['amplitude'])
+    set_entry_text(amp_value, f"{state['amplitude']:.2f}")
+    epsilon_slider.set(state['epsilon_r'])
+    set_entry_text(epsilon_value, f"{state['epsilon_r']:.2f}")
+    sigma_slider.set(np.log10(state['sigma']))
+    set_entry_text(sigma_value, f"{state['sigma']:.5f}")
+    mu_slider.set(state['mu_r'])
+    set_entry_text(mu_value, f"{state['mu_r']:.2f}")
+    engine_var.set(state['engine'])
+    time_engine = ENGINES[state['engine']]
+    if e_line1.get_visible() != state['e_visible']:
+        show_e_field()
+    if b_line1.get_visible() != state['b_visible']:
+        show_b_field()
+    frame_number = state['frame_number']
+    
+    # Apply right away rather than through the scheduler, continuing the
+    # time-domain solver from the saved arrays
+    restore = None
+    if 'time_solver' in state:
+        restore = (state['time_solver'],
+                   {name[len('solver_'):]: array for name, array in arrays.items() if name.startswith('solver_')})
+    inputs = read_inputs()
+    update_scheduler.last_inputs = inputs
+    apply_params(inputs, restore)
+    
+    if 'view_3d' in state:
+        show_3d_plot()
+        show_3d_plot.ax_3d.view_init(elev=state['view_3d']['elev'], azim=state['view_3d']['azim'])
+        show_3d_plot.frame_3d = state['view_3d']['frame']
+        show_3d_plot.canvas_3d.draw_idle()
+    if 'field_map' in state:
+        field_map_window.show()
+        field_map_window.angle_slider.set(state['field_map']['angle'])
+        field_map_window.polarization_var.set(state['field_map']['polarization'])
+        field_map_window.update()
+    
+    # The 3D window keeps the 2D animation paused while it is open
+    view_3d_open = hasattr(show_3d_plot, 'window') and show_3d_plot.window.winfo_exists()
+    if state['paused'] or view_3d_open:
+        anim_timer.stop()
+        pause_button.config(text='Start')
+    else:
+        start_2d_animation()
+        pause_button.config(text='Pause')
+    if frame_producer is None:
+        animate(frame_number)
+    blit_manager.update()
+
+def save_session_dialog():
+    path = filedialog.asksaveasfilename(defaultextension=SESSION_EXTENSION,
+                                        filetypes=[("Wave sessions", "*" + SESSION_EXTENSION)])
+    if not path:
+        return
+    try:
+        save_session(path, *session_snapshot())
+    except OSError as error:
+        messagebox.showerror("Error", f"Could not save the session: {error}")
 
+def load_session_dialog():
+    path = filedialog.askopenfilename(filetypes=[("Wave sessions", "*" + SESSION_EXTENSION)])
+    if not path:
+        return
+    try:
+        apply_session(*load_session(path))
+    except (OSError, ValueError, KeyError) as error:
+        messagebox.showerror("Error", f"Could not load the session: {error}")
+
+session_frame = tk.Frame(control_frame, bg=DARKER_BG)
+session_frame.grid(row=14, column=0, columnspan=3, pady=(0, 10))
+save_session_button = create_custom_button(session_frame, "Save Session", save_session_dialog)
+save_session_button.pack(side='left', padx=5)
+load_session_button = create_custom_button(session_frame, "Load Session", load_session_dialog)
+load_session_button.pack(side='left', padx=5)
+
+# Recording: Record streams every frame of the 2D curves into a folder of
+# memory-mapped chunk files (recorder.py) until it is pressed again or the
+# inputs change, so runs of any length fit on disk instead of in memory
+def toggle_recording():
+    global recording
+    if recording is not None:
+        stop_recording()
+        return
+    generation, cache, solver = frame_state
+    if cache is None:
+        return
+    directory = filedialog.askdirectory(title="Record into folder", mustexist=False)
+    if not directory:
+        return
+    state = {'freq': float(freq), 'amplitude': float(amplitude), 'epsilon_r': float(epsilon_r),
+             'sigma': float(sigma), 'mu_r': float(mu_r),
+             'material': material_var.get(), 'engine': engine_var.get()}
+    try:
+        recording = (generation, FrameRecorder(directory, curve_positions(cache, solver), state))
+    except OSError as error:
+        messagebox.showerror("Error", f"Could not start the recording: {error}")
+        return
+    record_button.config(text="Stop Recording")
+
+def stop_recording():
+    global recording
+    current, recording = recording, None
+    current[1].close()
+    record_button.config(text="Record")
+
+# Plays back a recording in the 2D plot: the slider picks any frame and only
+# that frame is read from disk. The live animation is paused meanwhile and
+# takes over again when the window is closed.
+class RecordingViewer:
+    def __init__(self, root):
+        self.root = root
+        self.window = None
+        self.recording = None
+        self.index = 0
+        self.timer = canvas.new_timer(interval=10)
+        self.timer.add_callback(self.advance)
+        self.playing = False
+    
+    def is_open(self):
+        return self.window is not None and self.window.winfo_exists()
+    
+    def build(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Recording Playback")
+        self.window.configure(bg=DARK_BG)
+        
+        self.info_label = tk.Label(self.window, text="", bg=DARK_BG, fg=TEXT_COLOR)
+        self.info_label.pack(padx=10, pady=(10, 0))
+        controls = tk.Frame(self.window, bg=DARK_BG)
+        controls.pack(fill='x', padx=10, pady=10)
+        self.play_button = create_custom_button(controls, "Play", self.toggle_play)
+        self.play_button.pack(side='left', padx=5)
+        self.frame_slider = ttk.Scale(controls, from_=0, to=0, orient="horizontal", length=400,
+                                      style='Dark.Horizontal.TScale', command=self.seek)
+        self.frame_slider.pack(side='left', fill='x', expand=True, padx=5)
+        self.frame_label = tk.Label(controls, text="", width=28, bg=DARK_BG, fg=ACCENT_COLOR)
+        self.frame_label.pack(side='left')
+        
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
     
-   
-    
-# Initial parameter display
-update_param_display()
+    def open(self):
+        directory = filedialog.askdirectory(title="Open recording")
+        if not directory:
+            return
+        try:
+            recording = Recording(directory)
+        except (OSError, ValueError, KeyError) as error:
+            messagebox.showerror("Error", f"Could not open the recording: {error}")
+            return
+        if len(recording) == 0:
+            messagebox.showerror("Error", "The recording holds no frames")
+            return
+        if pause_button.config('text')[-1] == 'Pause':
+            toggle_animation()
+        if not self.is_open():
+            self.build()
+        self.window.lift()
+        self.recording = recording
+        state = recording.state
+        text = f"{len(recording)} frames"
+        if 'freq' in state:
+            # Recorded from this window: name the inputs it was recorded with
+            text = (f"{state['engine']}, f={format_frequency(state['freq'])}, εr={state['epsilon_r']:.2f}, "
+                    f"σ={state['sigma']:.5f} S/m, " + text)
+        self.info_label.config(text=text)
+        self.frame_slider.config(to=len(recording) - 1)
+        self.frame_slider.set(0)
+        self.show(0)
+    
+    def seek(self, value):
+        index = int(round(float(value)))
+        if index != self.index:
+            self.show(index)
+    
+    def show(self, index):
+        if self.recording is None:
+            return
+        self.index = index
+        time, parts = self.recording.frame(index)
+        for line, x, y in zip((e_line1, b_line1, e_line2, b_line2), self.recording.positions, parts):
+            line_decimator.set_data(line, x, y)
+        self.frame_label.config(text=f"frame {index + 1}/{len(self.recording)}, t={time * 1e9:.3f} ns")
+        blit_manager.update()
+    
+    def toggle_play(self):
+        self.playing = not self.playing
+        if self.playing:
+            profiler.frame_reset('playback')
+            self.timer.start()
+        else:
+            self.timer.stop()
+        self.play_button.config(text="Pause" if self.playing else "Play")
+    
+    def advance(self):
+        profiler.frame_tick('playback', 10)
+        index = (self.index + 1) % len(self.recording)
+        self.show(index)
+        self.frame_slider.set(index)
+    
+    def close(self):
+        self.timer.stop()
+        self.playing = False
+        self.window.destroy()
+        self.recording = None
+        # Back to the live curves
+        if frame_producer is None:
+            animate(frame_number)
+        blit_manager.update()
+
+recording_viewer = RecordingViewer(root)
+
+recording_frame = tk.Frame(control_frame, bg=DARKER_BG)
+recording_frame.grid(row=15, column=0, columnspan=3, pady=(0, 10))
+record_button = create_custom_button(recording_frame, "Record", toggle_recording)
+record_button.pack(side='left', padx=5)
+open_recording_button = create_custom_button(recording_frame, "Open Recording", recording_viewer.open)
+open_recording_button.pack(side='left', padx=5)
 
 # Configure grid weights
 main_frame.grid_columnconfigure(0, weight=3)
@@ -1136,8 +1864,17 @@ main_frame.grid_rowconfigure(0, weight=1)
 
 # Start the animation
 
-anim.event_source.start()
+start_2d_animation()
 def on_closing():
+    transition_analysis.shutdown()
+    if recording is not None:
+        stop_recording()
+    if frame_producer is not None:
+        frame_producer.shutdown()
+        frame_ring.close()
+        frame_ring.unlink()
+    if cli_args.trace:
+        profiler.export_chrome_trace(cli_args.trace)
     root.quit()
     root.destroy()
 root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from wave_physics import calculate_wave_params, solve_wave_params, describe_wave, FieldCache, adaptive_grid
+from wave_export import build_2d_figure, build_3d_figure
+from multilayer import LayerStack, Layer
+from oblique import ObliqueBoundary, FieldMap
+from dispersion import material_table
+from fdtd import FDTD1D
+from pulse import WidebandPulse
+from decimation import LineDecimator
+from session import save_session, load_session
+from recorder import FrameRecorder, Recording
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 1.5  # Slower than baseline by this factor counts as a regression
+
+# Default parameters of the GUI
+PARAMS = (1.5e8, 1.0, 1.0, 0.01, 1.0)  # freq, amplitude, epsilon_r, sigma, mu_r
+
+
+# Each benchmark is a setup function returning the callable to time
+BENCHMARKS = {}
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('calculate_wave_params')
+def bench_scalar_params():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    return lambda: calculate_wave_params(freq, epsilon_r, sigma, mu_r)
+
+# Scalar path with a new input every call, so the cache always misses
+@benchmark('calculate_wave_params_miss')
+def bench_scalar_params_miss():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    counter = iter(range(10 ** 9))
+    return lambda: calculate_wave_params(freq * (1 + next(counter) * 1e-6), epsilon_r, sigma, mu_r)
+
+@benchmark('solve_wave_params_1M')
+def bench_batched_params():
+    freq = np.logspace(7, np.log10(2e9), 1000)[:, None]
+    epsilon_r = np.linspace(1, 10, 1000)[None, :]
+    return lambda: solve_wave_params(freq, epsilon_r, 0.01, 1.0)
+
+# Default sweep of the transition-frequency window: 10k points over +-1 decade
+@benchmark('transition_sweep')
+def bench_transition_sweep():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    ft = calculate_wave_params(freq, epsilon_r, sigma, mu_r)[4]
+    freq_range = np.logspace(np.log10(ft) - 1, np.log10(ft) + 1, 10_000)
+    return lambda: solve_wave_params(freq_range, epsilon_r, sigma, mu_r)
+
+# Two-pole tissue model over a 1M-point sweep, looked up in its table
+@benchmark('dispersive_sweep_1M')
+def bench_dispersive_sweep():
+    table = material_table('Muscle')
+    freq = np.logspace(7, np.log10(2e9), 1_000_000)
+
+    def sweep():
+        epsilon_r, sigma = table(freq)
+        return solve_wave_params(freq, epsilon_r, sigma, 1.0)
+    return sweep
+
+# 100-layer stack: reflectance/transmittance spectrum and a field profile
+def make_stack():
+    rng = np.random.default_rng(0)
+    layers = [Layer(rng.uniform(1, 10), rng.uniform(0, 0.1), 1.0, rng.uniform(0.01, 0.05)) for _ in range(100)]
+    return LayerStack(layers, substrate=(4.0, 0.01, 1.0))
+
+@benchmark('multilayer_spectrum')
+def bench_multilayer_spectrum():
+    stack = make_stack()
+    freqs = np.linspace(1e7, 2e9, 1000)
+    return lambda: stack.spectrum(freqs)
+
+@benchmark('multilayer_fields')
+def bench_multilayer_fields():
+    stack = make_stack()
+    x = np.linspace(0, 5, 1000)
+    return lambda: stack.field_phasors(x, 1.5e8)
+
+# Wideband pulse over 1000 points: synthesis with 4096 time samples after a
+# parameter change, and one frame of playback
+@benchmark('wideband_solve_4096x1000')
+def bench_wideband_solve():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    x = np.linspace(0, 5, 1000)
+    pulse = WidebandPulse(x[x <= 1], x[x > 1])
+    return lambda: pulse.solve(freq, amplitude, 4.0, sigma, mu_r, 'modulated')
+
+@benchmark('wideband_frame')
+def bench_wideband_frame():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    x = np.linspace(0, 5, 1000)
+    pulse = WidebandPulse(x[x <= 1], x[x > 1])
+    pulse.solve(freq, amplitude, 4.0, sigma, mu_r, 'modulated')
+
+    def frame():
+        pulse.advance(1e-10)
+        pulse.fields()
+    return frame
+
+# Reopening a saved wideband pulse (two 1000 x 4096 histories) and
+# continuing playback from it, instead of solving again
+@benchmark('session_load_wideband')
+def bench_session_load():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    x = np.linspace(0, 5, 1000)
+    pulse = WidebandPulse(x[x <= 1], x[x > 1])
+    pulse.solve(freq, amplitude, 4.0, sigma, mu_r, 'modulated')
+    directory = tempfile.TemporaryDirectory()  # Removed with the closure
+    path = os.path.join(directory.name, 'pulse.emws')
+    save_session(path, *pulse.snapshot())
+
+    def load():
+        pulse.restore(*load_session(path))
+        return directory
+    return load
+
+# Recording one frame of four 2500-point curves, and reading a random frame
+# back from a recording of several chunks
+@benchmark('record_frame_10k')
+def bench_record_frame():
+    directory = tempfile.TemporaryDirectory()  # Removed with the closure
+    x = np.linspace(0, 5, 2500)
+    recorder = FrameRecorder(os.path.join(directory.name, 'run'), [x] * 4, chunk_bytes=2 ** 20)
+    parts = [np.sin(x)] * 4
+
+    def record():
+        recorder.append(0.0, parts)
+        return directory
+    return record
+
+@benchmark('recording_seek_10k')
+def bench_recording_seek():
+    directory = tempfile.TemporaryDirectory()
+    x = np.linspace(0, 5, 2500)
+    recorder = FrameRecorder(os.path.join(directory.name, 'run'), [x] * 4, chunk_bytes=2 ** 20)
+    for frame in range(1000):
+        recorder.append(frame * 1e-10, [np.sin(x + frame)] * 4)
+    recorder.close()
+    recording = Recording(os.path.join(directory.name, 'run'))
+    counter = iter(range(10 ** 9))
+
+    def seek():
+        # Strided through the recording, so every call maps another chunk
+        time, parts = recording.frame(next(counter) * 7919 % len(recording))
+        np.array(parts[0])
+        return directory
+    return seek
+
+# TE and TM reflectance over 90 angles x 1000 frequencies
+@benchmark('oblique_map_90x1000')
+def bench_oblique_map():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    boundary = ObliqueBoundary(4.0, sigma, mu_r)
+    angles = np.radians(np.linspace(0, 89, 90))
+    freqs = np.logspace(6, 10, 1000)
+    return lambda: boundary.reflectance_map(angles, freqs)
+
+# 512 x 512 x-z field map: rebuilding the phasor grid, and one frame of it
+@benchmark('field_map_build_512')
+def bench_field_map_build():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    boundary = ObliqueBoundary(4.0, sigma, mu_r)
+    return lambda: FieldMap(boundary, freq, np.radians(30), amplitude)
+
+@benchmark('field_map_frame_512')
+def bench_field_map_frame():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    field_map = FieldMap(ObliqueBoundary(4.0, sigma, mu_r), freq, np.radians(30), amplitude)
+    counter = iter(range(10 ** 9))
+    return lambda: field_map.frame(next(counter) * 1e-10)
+
+# What update_params -> update_param_display recomputes, without the widgets
+@benchmark('parameter_update')
+def bench_parameter_update():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+
+    def update():
+        omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = calculate_wave_params(
+            freq, epsilon_r, sigma, mu_r)
+        FieldCache(*adaptive_grid(omega, beta, alpha), amplitude, omega, beta, alpha, eta)
+        describe_wave(freq, amplitude, epsilon_r, sigma, mu_r)
+    return update
+
+# One FDTD time step on a 100k-cell grid
+@benchmark('fdtd_step_100k')
+def bench_fdtd_step():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    solver = FDTD1D(freq, amplitude, 4.0, sigma, mu_r, n_cells=100_000)
+    return solver.step
+
+# One step of a 64-configuration ensemble on 10k cells each, in one kernel
+@benchmark('fdtd_ensemble_64x10k')
+def bench_fdtd_ensemble():
+    freq, amplitude, epsilon_r, sigma, mu_r = PARAMS
+    solver = FDTD1D(freq, amplitude, np.linspace(1, 10, 64), sigma, mu_r, n_cells=10_000)
+    return solver.step
+
+# Per-frame work of animate() and update_3d(): field evaluation and set_data
+@benchmark('animate_frame')
+def bench_animate_frame():
+    fig, draw_frame = build_2d_figure(*PARAMS)
+    counter = iter(range(10 ** 9))
+    return lambda: draw_frame(next(counter))
+
+@benchmark('update_3d_frame')
+def bench_update_3d_frame():
+    fig, draw_frame = build_3d_figure(*PARAMS)
+    counter = iter(range(10 ** 9))
+    return lambda: draw_frame(next(counter))
+
+# Min/max decimation of a 100k-point curve to the columns of the 2D axes
+@benchmark('decimate_100k')
+def bench_decimate():
+    fig, draw_frame = build_2d_figure(*PARAMS)
+    ax = fig.axes[0]
+    line, = ax.plot([], [])
+    decimator = LineDecimator(ax)
+    x = np.linspace(1, 5, 100_000)
+    y = np.exp(-0.5 * x) * np.cos(300 * x)
+    return lambda: decimator.set_data(line, x, y)
+
+# Full Agg redraw of a frame
+@benchmark('render_2d_agg')
+def bench_render_2d():
+    fig, draw_frame = build_2d_figure(*PARAMS)
+    counter = iter(range(10 ** 9))
+
+    def render():
+        draw_frame(next(counter))
+        fig.canvas.draw()
+    return render
+
+@benchmark('render_3d_agg')
+def bench_render_3d():
+    fig, draw_frame = build_3d_figure(*PARAMS)
+    counter = iter(range(10 ** 9))
+
+    def render():
+        draw_frame(next(counter))
+        fig.canvas.draw()
+    return render
+
+
+# Best-of-repeat seconds per call, with the loop count chosen so that one
+# repeat takes about 0.2 s
+def time_call(func, repeat=5):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def run_benchmarks(names=None, repeat=5):
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = time_call(BENCHMARKS[name](), repeat)
+    return results
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+# Compares results with a baseline; returns the names that regressed
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    regressions = []
+    print(f"{'benchmark':<24}{'time':>12}{'baseline':>12}{'ratio':>8}")
+    for name, seconds in results.items():
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            flag = '  REGRESSION' if ratio > threshold else ''
+            print(f"{name:<24}{format_time(seconds):>12}{format_time(baseline[name]):>12}{ratio:>8.2f}{flag}")
+            if ratio > threshold:
+                regressions.append(name)
+        else:
+            print(f"{name:<24}{format_time(seconds):>12}{'-':>12}{'-':>8}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the physics kernels and the render path.")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown factor that counts as a regression")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(args.names, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as fh:
+            json.dump(baseline, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) slower than {args.threshold}x baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
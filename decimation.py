@@ -0,0 +1,91 @@
+import numpy as np
+
+
+# Level of detail for the animated curves. A line never needs more vertices
+# than its axes has pixel columns: within each column only the lowest and
+# highest point can be seen, so keeping those two (in their original order)
+# draws the same picture as the full curve, up to antialiasing. The curves can then be
+# computed at any resolution while the renderer only gets about two vertices
+# per pixel column.
+
+# Point layout of one x array for the current view: the indices of the
+# visible points and where each pixel column starts among them
+class ColumnLayout:
+    def __init__(self, x, x_min, x_max, columns):
+        self.size = len(x)
+        self.first = float(x[0]) if len(x) else None
+        self.last = float(x[-1]) if len(x) else None
+
+        # One point beyond each edge of the view, so the line still reaches it
+        lo = max(0, np.searchsorted(x, x_min, side='left') - 1)
+        hi = min(len(x), np.searchsorted(x, x_max, side='right') + 1)
+        self.visible = slice(lo, hi)
+        column = np.clip(((x[lo:hi] - x_min) / (x_max - x_min) * columns).astype(int), -1, columns)
+        # x is sorted, so every column is a contiguous run of points
+        self.starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+        self.column_of_point = np.repeat(np.arange(len(self.starts)), np.diff(np.r_[self.starts, hi - lo]))
+        self.index = np.arange(hi - lo)
+        # Only worth it when the columns average well over two points
+        self.decimate = hi - lo > 4 * len(self.starts)
+
+    def matches(self, x):
+        return (len(x) == self.size and len(x) > 0
+                and float(x[0]) == self.first and float(x[-1]) == self.last)
+
+    # Indices of the points to keep: the minimum and maximum of every column
+    def keep(self, y):
+        y = y[self.visible]
+        n = len(y)
+        lowest = np.minimum.reduceat(y, self.starts)
+        highest = np.maximum.reduceat(y, self.starts)
+        # First index in each column where the extreme is reached
+        at_lowest = np.minimum.reduceat(
+            np.where(y == lowest[self.column_of_point], self.index, n), self.starts)
+        at_highest = np.minimum.reduceat(
+            np.where(y == highest[self.column_of_point], self.index, n), self.starts)
+        keep = np.empty(2 * len(self.starts), dtype=np.intp)
+        keep[0::2] = np.minimum(at_lowest, at_highest)
+        keep[1::2] = np.maximum(at_lowest, at_highest)
+        return keep + self.visible.start
+
+
+# Decimates the lines of one axes to min/max envelopes of its pixel columns.
+# Lines are drawn through set_data(line, x, y) instead of line.set_data; the
+# full data of each line is kept so that refresh() can decimate it again
+# after the view changed (resize, zoom) even while the animation is paused.
+class LineDecimator:
+    def __init__(self, ax):
+        self.ax = ax
+        self.layouts = {}
+        self.full = {}
+        ax.callbacks.connect('xlim_changed', lambda ax: self.refresh())
+
+    # Pixel columns of the axes at the current canvas size
+    def columns(self):
+        return max(1, int(round(self.ax.bbox.width)))
+
+    def decimate(self, line, x, y):
+        layout = self.layouts.get(line)
+        if layout is None or not layout.matches(x):
+            x_min, x_max = sorted(self.ax.get_xlim())
+            layout = self.layouts[line] = ColumnLayout(np.asarray(x), x_min, x_max, self.columns())
+        if not layout.decimate:
+            return x, y
+        keep = layout.keep(np.asarray(y))
+        return np.asarray(x)[keep], np.asarray(y)[keep]
+
+    def set_data(self, line, x, y):
+        # y may be a view of a buffer that is reused for the next frame
+        self.full[line] = (x, np.array(y))
+        line.set_data(*self.decimate(line, x, y))
+
+    # Forgets the layouts, for x arrays that changed without changing their
+    # size or end points
+    def reset(self):
+        self.layouts.clear()
+
+    # Decimates the current data of every line again for a new view
+    def refresh(self):
+        self.reset()
+        for line, (x, y) in self.full.items():
+            line.set_data(*self.decimate(line, x, y))
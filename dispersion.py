@@ -0,0 +1,125 @@
+import numpy as np
+
+from wave_physics import EPSILON_0
+
+
+# Dispersion models give the relative complex permittivity with the same
+# time convention as the rest of the app (e^(j*omega*t), so losses show up
+# as a negative imaginary part: epsilon = epsilon' - j*epsilon''). Each pole
+# contributes a susceptibility on top of the material's epsilon_inf.
+
+# Debye relaxation: delta_eps / (1 + j*omega*tau)
+class Debye:
+    def __init__(self, delta_eps, tau):
+        self.delta_eps = delta_eps
+        self.tau = tau
+
+    def susceptibility(self, omega):
+        return self.delta_eps / (1 + 1j * omega * self.tau)
+
+# Lorentz resonance: delta_eps * omega_0^2 / (omega_0^2 - omega^2 + j*omega*damping)
+class Lorentz:
+    def __init__(self, delta_eps, omega_0, damping):
+        self.delta_eps = delta_eps
+        self.omega_0 = omega_0
+        self.damping = damping
+
+    def susceptibility(self, omega):
+        return self.delta_eps * self.omega_0 ** 2 / (self.omega_0 ** 2 - omega ** 2 + 1j * omega * self.damping)
+
+# Drude free carriers: -omega_p^2 / (omega^2 - j*omega*collision_rate)
+class Drude:
+    def __init__(self, omega_p, collision_rate):
+        self.omega_p = omega_p
+        self.collision_rate = collision_rate
+
+    def susceptibility(self, omega):
+        return -self.omega_p ** 2 / (omega ** 2 - 1j * omega * self.collision_rate)
+
+
+# A material made of epsilon_inf, any number of poles and a static
+# conductivity sigma (S/m)
+class DispersiveMaterial:
+    def __init__(self, name, epsilon_inf, poles=(), sigma=0.0, mu_r=1.0):
+        self.name = name
+        self.epsilon_inf = epsilon_inf
+        self.poles = list(poles)
+        self.sigma = sigma
+        self.mu_r = mu_r
+
+    # Relative complex permittivity of the poles, without the conductivity term
+    def permittivity(self, freq):
+        omega = 2 * np.pi * np.asarray(freq, dtype=float)
+        epsilon = np.full(omega.shape, self.epsilon_inf, dtype=complex)
+        for pole in self.poles:
+            epsilon += pole.susceptibility(omega)
+        return epsilon
+
+    # (epsilon_r, sigma) as the wave solvers take them: the real permittivity
+    # and the static conductivity plus the dielectric losses as an equivalent
+    # conductivity omega*epsilon_0*epsilon''
+    def wave_params(self, freq):
+        freq = np.asarray(freq, dtype=float)
+        epsilon = self.permittivity(freq)
+        return epsilon.real, self.sigma - 2 * np.pi * freq * EPSILON_0 * epsilon.imag
+
+
+# Precomputed epsilon(omega) of a material on a log-frequency grid. Lookups
+# interpolate in log(f) instead of re-evaluating every pole, so sweeps and
+# the frequency slider cost two np.interp calls however many poles there are.
+class DispersionTable:
+    def __init__(self, material, f_min=1e3, f_max=1e12, points_per_decade=200):
+        self.material = material
+        self.name = material.name
+        self.mu_r = material.mu_r
+        self.sigma = material.sigma
+        decades = np.log10(f_max) - np.log10(f_min)
+        self.log_freq = np.linspace(np.log10(f_min), np.log10(f_max), int(decades * points_per_decade) + 1)
+        epsilon = material.permittivity(10 ** self.log_freq)
+        self.epsilon_real = epsilon.real
+        self.epsilon_imag = epsilon.imag
+
+    # Interpolated relative complex permittivity (clamped outside the table)
+    def permittivity(self, freq):
+        log_freq = np.log10(np.asarray(freq, dtype=float))
+        return (np.interp(log_freq, self.log_freq, self.epsilon_real)
+                + 1j * np.interp(log_freq, self.log_freq, self.epsilon_imag))
+
+    # Same as DispersiveMaterial.wave_params, from the table
+    def wave_params(self, freq):
+        freq = np.asarray(freq, dtype=float)
+        log_freq = np.log10(freq)
+        epsilon_real = np.interp(log_freq, self.log_freq, self.epsilon_real)
+        epsilon_imag = np.interp(log_freq, self.log_freq, self.epsilon_imag)
+        return epsilon_real, self.sigma - 2 * np.pi * freq * EPSILON_0 * epsilon_imag
+
+    def __call__(self, freq):
+        return self.wave_params(freq)
+
+
+# Approximate room-temperature models, good enough for visualisation. The
+# tissue models are Debye fits to the multi-pole data of Gabriel et al.
+MATERIALS = {
+    'Water (distilled)': DispersiveMaterial(
+        'Water (distilled)', 5.2, [Debye(74.9, 9.4e-12)], sigma=5.5e-6),
+    'Sea water': DispersiveMaterial(
+        'Sea water', 4.9, [Debye(67.1, 8.3e-12)], sigma=4.0),
+    'Muscle': DispersiveMaterial(
+        'Muscle', 4.0, [Debye(50.0, 7.23e-12), Debye(7000.0, 353.7e-9)], sigma=0.2),
+    'Fat': DispersiveMaterial(
+        'Fat', 2.5, [Debye(9.0, 7.96e-12), Debye(35.0, 15.92e-9)], sigma=0.035),
+    'Dry soil': DispersiveMaterial(
+        'Dry soil', 3.0, [Debye(0.5, 1e-9)], sigma=1e-4),
+    'Wet soil': DispersiveMaterial(
+        'Wet soil', 5.0, [Debye(15.0, 9.4e-12), Debye(10.0, 1e-8)], sigma=0.01),
+    'Ionospheric plasma': DispersiveMaterial(
+        'Ionospheric plasma', 1.0, [Drude(2 * np.pi * 9e6, 1e4)]),
+}
+
+_tables = {}
+
+# Cached table for a library material
+def material_table(name):
+    if name not in _tables:
+        _tables[name] = DispersionTable(MATERIALS[name])
+    return _tables[name]
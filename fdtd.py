@@ -0,0 +1,221 @@
+import numpy as np
+
+from wave_physics import EPSILON_0, MU_0, ETA_AIR, BOUNDARY_X, B_FIELD_SCALE, solve_wave_params
+
+
+C_0 = 1 / np.sqrt(EPSILON_0 * MU_0)  # Speed of light in vacuum
+
+DOMAIN_LENGTH = 5.0  # Same x range as the 2D plot
+SOURCE_X = 0.25  # Plane where the incident wave is injected
+COURANT = 0.99  # c*dt/dx; 1 is the stability limit in air
+CELLS_PER_WAVELENGTH = 40  # Resolution of the shortest wavelength on the grid
+MIN_CELLS = 1000
+# Fields and coefficients are single precision: the stepping is memory bound,
+# and float32 halves the traffic (plenty for display purposes)
+DTYPE = np.float32
+
+
+# Incident waveforms as functions of the retarded time tau (time since the
+# wavefront passed the source plane); all are zero for tau < 0
+def cw_waveform(tau, omega):
+    return np.where(tau >= 0, np.cos(omega * tau), 0.0)
+
+# Continuous wave switched on smoothly over three periods
+def ramped_waveform(tau, omega, periods=3):
+    ramp_time = periods * 2 * np.pi / omega
+    ramp = np.sin(np.pi / 2 * np.clip(tau / ramp_time, 0, 1)) ** 2
+    return ramp * np.cos(omega * tau)
+
+# Gaussian-modulated pulse centred on the carrier frequency
+def pulse_waveform(tau, omega, periods=1.5):
+    width = periods * 2 * np.pi / omega
+    delay = 4 * width
+    return np.exp(-((tau - delay) / width) ** 2) * np.cos(omega * (tau - delay))
+
+WAVEFORMS = {'cw': cw_waveform, 'ramp': ramped_waveform, 'pulse': pulse_waveform}
+
+
+# Update kernels. E lives on the nodes x_i = i*dx (i = 0..n), H on the half
+# nodes x_(i+1/2) (i = 0..n-1). Every array has the cells on its last axis,
+# so the same kernels step one domain or a stack of them.
+
+# H <- H - ch * dE/dx (Faraday)
+def update_h(e, h, ch, work):
+    np.subtract(e[..., 1:], e[..., :-1], out=work)
+    work *= ch
+    h -= work
+
+# Interior E <- ca*E - cb * dH/dx (Ampere with conduction current, averaged
+# in time so the lossy update stays stable for any sigma)
+def update_e(e, h, ca, cb, work):
+    interior = e[..., 1:-1]
+    np.subtract(h[..., 1:], h[..., :-1], out=work)
+    work *= cb
+    interior *= ca
+    interior -= work
+
+# First-order Mur absorbing boundary for the given wave speed next to it
+def mur_coefficient(speed, dt, dx):
+    return (speed * dt - dx) / (speed * dt + dx)
+
+# One time step of a window of the grid, in place. source is the index in
+# the window of the first total-field E node (the TF/SF source may lie
+# outside the window, then it is skipped). mur_left and mur_right are the
+# Mur coefficients of the ends that are domain boundaries, None for ends
+# that border another window.
+def yee_step(e, h, ca, cb, ch, work_e, work_h, source, incident, time, dt, mur_left=None, mur_right=None):
+    old_left, old_right = e[..., 1].copy(), e[..., -2].copy()
+    update_h(e, h, ch, work_h)
+    # H just left of the source only sees the scattered field
+    if 0 < source <= h.shape[-1]:
+        h[..., source - 1] += ch[..., source - 1] * incident.e_at(time)
+    update_e(e, h, ca, cb, work_e)
+    # E at the source is total field: add the incident H it misses
+    if 0 < source < e.shape[-1] - 1:
+        e[..., source] += cb[..., source - 1] * incident.h_at(time + dt / 2)
+    if mur_left is not None:
+        e[..., 0] = old_left + mur_left * (e[..., 1] - e[..., 0])
+    if mur_right is not None:
+        e[..., -1] = old_right + mur_right * (e[..., -2] - e[..., -1])
+
+
+# Coefficient arrays for the lossy update on a grid of n_cells over length
+# metres: ca and cb for the interior E nodes, ch for the H nodes. The
+# material arguments may be arrays of shape (configs,) to build a batch.
+def yee_coefficients(n_cells, dx, dt, epsilon_r, sigma, mu_r, length=DOMAIN_LENGTH):
+    x_e = np.linspace(0, length, n_cells + 1)
+    x_h = (np.arange(n_cells) + 0.5) * dx
+    epsilon_r = np.asarray(epsilon_r, dtype=float)[..., None]
+    sigma = np.asarray(sigma, dtype=float)[..., None]
+    mu_r = np.asarray(mu_r, dtype=float)[..., None]
+
+    # Fraction of dielectric seen by each node: 1/2 for a node on the boundary
+    fill = np.where(x_e > BOUNDARY_X, 1.0, np.where(np.isclose(x_e, BOUNDARY_X), 0.5, 0.0))[1:-1]
+    eps = EPSILON_0 * (1 + fill * (epsilon_r - 1))
+    loss = fill * sigma * dt / (2 * eps)
+    ca = (1 - loss) / (1 + loss)
+    cb = dt / (eps * dx) / (1 + loss)
+    mu = MU_0 * (1 + (x_h > BOUNDARY_X) * (mu_r - 1))
+    ch = dt / (mu * dx)
+    return x_e, x_h, ca.astype(DTYPE), cb.astype(DTYPE), ch.astype(DTYPE)
+
+# Cells needed to resolve the shortest wavelength (in air or in any of the
+# materials) with CELLS_PER_WAVELENGTH cells
+def grid_cells(freq, epsilon_r, sigma, mu_r, length=DOMAIN_LENGTH):
+    beta = solve_wave_params(freq, epsilon_r, sigma, mu_r)[1]
+    shortest = min(C_0 / freq, np.min(2 * np.pi / beta))
+    return max(MIN_CELLS, int(np.ceil(length / shortest * CELLS_PER_WAVELENGTH)))
+
+# Plane wave injected by the TF/SF source: E at the first total-field node
+# (x_e) and H at the scattered-field node left of it (x_h)
+class IncidentWave:
+    def __init__(self, freq, amplitude, waveform, x_e, x_h):
+        self.omega = 2 * np.pi * freq
+        self.amplitude = amplitude
+        self.waveform = WAVEFORMS[waveform]
+        self.x_e = x_e
+        self.x_h = x_h
+
+    # Incident E at x and time t
+    def field(self, x, t):
+        return self.amplitude * self.waveform(t - (x - self.x_e) / C_0, self.omega)
+
+    def e_at(self, t):
+        return self.field(self.x_e, t)
+
+    def h_at(self, t):
+        return self.field(self.x_h, t) / ETA_AIR
+
+
+# Time-domain solution of the same problem as the analytic view: a plane
+# wave injected in air (total-field/scattered-field source at SOURCE_X)
+# travelling towards the lossy dielectric at x > 1, on a Yee grid with Mur
+# absorbing boundaries. Unlike the closed form it shows the source switching
+# on, pulses and the wave reflected at the boundary.
+#
+# The material arguments may also be arrays (e.g. shape (configs,)): the
+# grid then holds a whole ensemble as configs x cells arrays, shares one dx
+# and dt, and every step updates all of it in the same vectorized kernels.
+class FDTD1D:
+    def __init__(self, freq, amplitude, epsilon_r, sigma, mu_r, waveform='ramp',
+                 n_cells=None, length=DOMAIN_LENGTH, courant=COURANT):
+        self.freq = freq
+        self.amplitude = amplitude
+        self.omega = 2 * np.pi * freq
+        self.batch_shape = np.broadcast(np.asarray(epsilon_r), np.asarray(sigma), np.asarray(mu_r)).shape
+
+        if n_cells is None:
+            n_cells = grid_cells(freq, epsilon_r, sigma, mu_r, length)
+        self.n_cells = n_cells
+        self.dx = length / n_cells
+        self.dt = courant * self.dx / C_0
+        self.x_e, self.x_h, self.ca, self.cb, self.ch = yee_coefficients(
+            n_cells, self.dx, self.dt, epsilon_r, sigma, mu_r, length)
+
+        self.e = np.zeros(self.batch_shape + (n_cells + 1,), dtype=DTYPE)
+        self.h = np.zeros(self.batch_shape + (n_cells,), dtype=DTYPE)
+        self._work_e = np.empty(self.batch_shape + (n_cells - 1,), dtype=DTYPE)
+        self._work_h = np.empty_like(self.h)
+        self.time = 0.0
+        self.steps = 0
+        self._target = 0.0
+
+        dielectric_speed = C_0 / np.sqrt(np.asarray(epsilon_r, dtype=float) * mu_r)
+        self.mur_left = mur_coefficient(C_0, self.dt, self.dx)
+        self.mur_right = mur_coefficient(dielectric_speed, self.dt, self.dx)
+
+        # First total-field E node; the incident wave is added across the
+        # interface between it and the H node on its left
+        self.source = int(round(SOURCE_X / self.dx))
+        self.incident = IncidentWave(freq, amplitude, waveform, self.x_e[self.source], self.x_h[self.source - 1])
+
+        # Slices of the plotted curves: E and H on each side of the boundary
+        boundary_e = np.searchsorted(self.x_e, BOUNDARY_X, side='right')
+        boundary_h = np.searchsorted(self.x_h, BOUNDARY_X, side='right')
+        self._air_e = slice(0, boundary_e)
+        self._diel_e = slice(boundary_e, None)
+        self._air_h = slice(0, boundary_h)
+        self._diel_h = slice(boundary_h, None)
+
+    # Advances the fields by n time steps
+    def step(self, n=1):
+        for _ in range(n):
+            yee_step(self.e, self.h, self.ca, self.cb, self.ch, self._work_e, self._work_h,
+                     self.source, self.incident, self.time, self.dt, self.mur_left, self.mur_right)
+            self.steps += 1
+            self.time = self.steps * self.dt
+
+    # Steps until the simulated time has advanced by duration; leftover
+    # fractions of a step carry over to the next call. With max_steps, a
+    # frame that would need more steps runs only that many and the rest is
+    # dropped, so fine grids play in slow motion instead of stalling the GUI.
+    def advance(self, duration, max_steps=None):
+        self._target += duration
+        n = int((self._target - self.time) / self.dt + 0.5)
+        if max_steps is not None and n > max_steps:
+            n = max_steps
+            self._target = self.time + n * self.dt
+        if n > 0:
+            self.step(n)
+
+    # Time-stepping state for session files: (plain values, arrays)
+    def snapshot(self):
+        return {'steps': self.steps}, {'e': self.e, 'h': self.h}
+
+    # Continues from the snapshot of a solver built with the same inputs
+    def restore(self, info, arrays):
+        self.e[...] = arrays['e']
+        self.h[...] = arrays['h']
+        self.steps = info['steps']
+        self.time = self._target = self.steps * self.dt
+
+    # Positions of the plotted curves: (x_e_air, x_h_air, x_e_dielectric, x_h_dielectric)
+    def positions(self):
+        return (self.x_e[self._air_e], self.x_h[self._air_h],
+                self.x_e[self._diel_e], self.x_h[self._diel_h])
+
+    # (e_air, b_air, e_dielectric, b_dielectric) in the units of the analytic
+    # view, where "B" is drawn as B_FIELD_SCALE * H
+    def fields(self):
+        b = B_FIELD_SCALE * self.h
+        return self.e[self._air_e], b[self._air_h], self.e[self._diel_e], b[self._diel_h]
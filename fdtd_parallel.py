@@ -0,0 +1,216 @@
+import argparse
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from fdtd import (FDTD1D, IncidentWave, yee_coefficients, yee_step, mur_coefficient, grid_cells,
+                  C_0, COURANT, DOMAIN_LENGTH, SOURCE_X, DTYPE)
+
+
+# Ensembles: every configuration is an independent grid, so the configs are
+# split into one block per worker and each worker steps its block as a
+# single configs x cells FDTD1D.
+
+def _run_ensemble_block(freq, amplitude, epsilon_r, sigma, mu_r, waveform, n_cells, steps):
+    solver = FDTD1D(freq, amplitude, epsilon_r, sigma, mu_r, waveform, n_cells=n_cells)
+    solver.step(steps)
+    return solver.e, solver.h
+
+# Runs every (epsilon_r, sigma, mu_r) configuration (1D arrays, broadcast
+# against each other) for the given simulated time on a shared grid.
+# Returns (x_e, e, x_h, h) with e and h of shape (configs, nodes).
+def run_ensemble(freq, amplitude, epsilon_r, sigma, mu_r, duration, waveform='ramp',
+                 n_cells=None, workers=None):
+    epsilon_r, sigma, mu_r = (np.ravel(a).astype(float) for a in np.broadcast_arrays(epsilon_r, sigma, mu_r))
+    if n_cells is None:
+        n_cells = grid_cells(freq, epsilon_r, sigma, mu_r)
+    dx = DOMAIN_LENGTH / n_cells
+    steps = int(round(duration / (COURANT * dx / C_0)))
+    workers = min(workers or os.cpu_count(), len(epsilon_r))
+    blocks = np.array_split(np.arange(len(epsilon_r)), workers)
+
+    if workers == 1:
+        e, h = _run_ensemble_block(freq, amplitude, epsilon_r, sigma, mu_r, waveform, n_cells, steps)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(_run_ensemble_block, freq, amplitude, epsilon_r[block], sigma[block],
+                                   mu_r[block], waveform, n_cells, steps) for block in blocks]
+            results = [future.result() for future in futures]
+        e = np.concatenate([r[0] for r in results])
+        h = np.concatenate([r[1] for r in results])
+    x_e = np.linspace(0, DOMAIN_LENGTH, n_cells + 1)
+    x_h = (np.arange(n_cells) + 0.5) * dx
+    return x_e, e, x_h, h
+
+
+# Long domains: the cells are split into one contiguous slab per worker
+# process. E, H and the update coefficients live in shared memory; each
+# worker copies its slab plus a halo of neighbouring cells into private
+# arrays, steps them block_steps times without any synchronisation (the
+# stale region spreads one cell per step from the halo edges, so the slab
+# itself stays exact while block_steps < halo), then writes its slab back.
+# That is two barriers per block instead of two per step.
+#
+# A worker that fails aborts the barrier, so the others stop waiting for it
+# (threading.BrokenBarrierError) and exit too; a barrier that is not reached
+# within BARRIER_TIMEOUT counts as a failure as well.
+BARRIER_TIMEOUT = 600  # s
+
+def _create_shared(shape, dtype):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _attach_shared(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _slab_worker(names, n_cells, slab, halo, steps, block_steps, dt, mur, incident, source, barrier):
+    try:
+        _step_slab(names, n_cells, slab, halo, steps, block_steps, dt, mur, incident, source, barrier)
+    except threading.BrokenBarrierError:
+        # Another worker failed, or one of them did not arrive in time
+        raise RuntimeError("FDTD slab worker stopped: the barrier was broken") from None
+    except BaseException:
+        barrier.abort()
+        raise
+
+def _step_slab(names, n_cells, slab, halo, steps, block_steps, dt, mur, incident, source, barrier):
+    n_nodes = n_cells + 1
+    handles, arrays = [], {}
+    try:
+        for key, shape in (('e', n_nodes), ('h', n_cells), ('ca', n_cells - 1), ('cb', n_cells - 1), ('ch', n_cells)):
+            shm, arrays[key] = _attach_shared(names[key], (shape,), DTYPE)
+            handles.append(shm)
+        lo, hi = slab  # E nodes owned by this worker
+        # Window of E nodes [a, b) and H nodes [a, b - 1)
+        a, b = max(0, lo - halo), min(n_nodes, hi + halo)
+        ca = arrays['ca'][a:b - 2].copy()  # interior E nodes a+1 .. b-2
+        cb = arrays['cb'][a:b - 2].copy()
+        ch = arrays['ch'][a:b - 1].copy()
+        work_e = np.empty(b - a - 2, dtype=DTYPE)
+        work_h = np.empty(b - a - 1, dtype=DTYPE)
+        mur_left = mur[0] if a == 0 else None
+        mur_right = mur[1] if b == n_nodes else None
+        owned_h = slice(lo, min(hi, n_cells))
+
+        done = 0
+        while done < steps:
+            e = arrays['e'][a:b].copy()
+            h = arrays['h'][a:b - 1].copy()
+            barrier.wait(BARRIER_TIMEOUT)  # everyone has read its halo
+            for _ in range(min(block_steps, steps - done)):
+                yee_step(e, h, ca, cb, ch, work_e, work_h, source - a, incident, done * dt, dt,
+                         mur_left, mur_right)
+                done += 1
+            arrays['e'][lo:hi] = e[lo - a:hi - a]
+            arrays['h'][owned_h] = h[owned_h.start - a:owned_h.stop - a]
+            barrier.wait(BARRIER_TIMEOUT)  # every slab is written back
+    finally:
+        arrays.clear()
+        for shm in handles:
+            shm.close()
+
+# Waits for the workers; as soon as one has failed, the others are terminated
+# (in case they are stuck rather than released by the aborted barrier)
+def _join_workers(processes, poll=0.1):
+    while True:
+        for process in processes:
+            process.join(poll)
+        if any(process.exitcode not in (None, 0) for process in processes):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            raise RuntimeError("an FDTD worker process failed")
+        if all(process.exitcode == 0 for process in processes):
+            return
+
+# Steps one long domain split across worker processes. Returns (x_e, e, x_h, h).
+def run_decomposed(freq, amplitude, epsilon_r, sigma, mu_r, duration, waveform='ramp',
+                   n_cells=None, workers=None, halo=64):
+    if n_cells is None:
+        n_cells = grid_cells(freq, epsilon_r, sigma, mu_r)
+    workers = workers or os.cpu_count()
+    # Slabs of E nodes, one per worker
+    edges = np.linspace(0, n_cells + 1, workers + 1).astype(int)
+    if halo < 2:
+        raise ValueError(f"halo must be at least 2 cells, got {halo}")
+    if halo > np.diff(edges).min():
+        raise ValueError(f"halo of {halo} cells is wider than the narrowest slab ({np.diff(edges).min()} cells)")
+    block_steps = halo - 1
+    dx = DOMAIN_LENGTH / n_cells
+    dt = COURANT * dx / C_0
+    steps = int(round(duration / dt))
+    x_e, x_h, ca, cb, ch = yee_coefficients(n_cells, dx, dt, epsilon_r, sigma, mu_r)
+    source = int(round(SOURCE_X / dx))
+    incident = IncidentWave(freq, amplitude, waveform, x_e[source], x_h[source - 1])
+    mur = (mur_coefficient(C_0, dt, dx), mur_coefficient(C_0 / np.sqrt(epsilon_r * mu_r), dt, dx))
+
+    handles, arrays = {}, {}
+    try:
+        for key, values in (('e', np.zeros(n_cells + 1)), ('h', np.zeros(n_cells)), ('ca', ca), ('cb', cb), ('ch', ch)):
+            handles[key], arrays[key] = _create_shared(values.shape, DTYPE)
+            arrays[key][:] = values
+        names = {key: shm.name for key, shm in handles.items()}
+        barrier = mp.Barrier(workers)
+        processes = [mp.Process(target=_slab_worker,
+                                args=(names, n_cells, (edges[i], edges[i + 1]), halo, steps, block_steps,
+                                      dt, mur, incident, source, barrier))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+        _join_workers(processes)
+        e = arrays['e'].copy()
+        h = arrays['h'].copy()
+    finally:
+        # The views must go before the blocks can be closed
+        arrays.clear()
+        for shm in handles.values():
+            shm.close()
+            shm.unlink()
+    return x_e, e, x_h, h
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run FDTD ensembles or long domains on several cores and report the throughput.")
+    parser.add_argument('--freq', type=float, default=1.5e8)
+    parser.add_argument('--amplitude', type=float, default=1.0)
+    parser.add_argument('--epsilon-r', type=float, default=4.0)
+    parser.add_argument('--sigma', type=float, default=0.01)
+    parser.add_argument('--mu-r', type=float, default=1.0)
+    parser.add_argument('--cells', type=int, default=1_000_000)
+    parser.add_argument('--steps', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--halo', type=int, default=64, help="halo width in cells (steps between exchanges + 1)")
+    parser.add_argument('--ensemble', type=int, metavar='N',
+                        help="run N configurations with epsilon_r from 1 to --epsilon-r instead of one long domain")
+    args = parser.parse_args()
+    if args.halo < 2:
+        parser.error("--halo must be at least 2")
+
+    dt = COURANT * DOMAIN_LENGTH / args.cells / C_0
+    start = time.perf_counter()
+    if args.ensemble:
+        epsilon_r = np.linspace(1, args.epsilon_r, args.ensemble)
+        run_ensemble(args.freq, args.amplitude, epsilon_r, args.sigma, args.mu_r, args.steps * dt,
+                     n_cells=args.cells, workers=args.workers)
+        cells = args.cells * args.ensemble
+    else:
+        try:
+            run_decomposed(args.freq, args.amplitude, args.epsilon_r, args.sigma, args.mu_r, args.steps * dt,
+                           n_cells=args.cells, workers=args.workers, halo=args.halo)
+        except ValueError as error:
+            parser.error(str(error))
+        cells = args.cells
+    elapsed = time.perf_counter() - start
+    print(f"{cells * args.steps / elapsed / 1e6:.1f} Mcell-steps/s on {args.workers} worker(s) ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import contextlib
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# A published frame: its sequence number, the ring slot holding it, the
+# generation it was computed for (which parameter set) and the frame data
+# split into parts, as views into the ring
+Frame = namedtuple('Frame', 'seq slot generation parts')
+
+
+# Fixed-size ring of frames in one shared-memory block, written by a single
+# producer (thread or process) and read by the consumer without copies. Each
+# slot has a header row [seq, generation, length of each part]; seq is -1
+# while the slot is being written, so the consumer only ever picks complete
+# frames and can tell afterwards whether a slot was overwritten under it.
+# Pass the name of an existing ring to attach to it from another process.
+class FrameRing:
+    def __init__(self, slots, capacity, parts=4, name=None):
+        self.slots = slots
+        self.capacity = capacity
+        self.parts = parts
+        header_bytes = slots * (2 + parts) * 8
+        create = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=header_bytes + slots * capacity * 8)
+        self.name = self.shm.name
+        self.header = np.ndarray((slots, 2 + parts), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((slots, capacity), dtype=np.float64, buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self.header[:] = 0
+            self.header[:, 0] = -1
+        self._next_seq = int(self.header[:, 0].max()) + 1
+
+    # Producer side: claims the next slot and returns (seq, slot data view)
+    def begin_write(self):
+        seq = self._next_seq
+        slot = seq % self.slots
+        self.header[slot, 0] = -1
+        return seq, self.data[slot]
+
+    # Producer side: publishes the frame written by begin_write
+    def publish(self, seq, generation, lengths):
+        slot = seq % self.slots
+        self.header[slot, 1] = generation
+        self.header[slot, 2:2 + len(lengths)] = lengths
+        self.header[slot, 0] = seq
+        self._next_seq = seq + 1
+
+    # Consumer side: the newest complete frame, or None
+    def latest(self):
+        slot = int(np.argmax(self.header[:, 0]))
+        seq = int(self.header[slot, 0])
+        if seq < 0:
+            return None
+        generation = int(self.header[slot, 1])
+        ends = np.cumsum(self.header[slot, 2:])
+        parts = np.split(self.data[slot, :ends[-1]], ends[:-1])
+        if self.header[slot, 0] != seq:
+            return None  # overwritten while reading the header
+        return Frame(seq, slot, generation, parts)
+
+    # True while the slot of frame still holds it; check after using the views
+    def holds(self, frame):
+        return self.header[frame.slot, 0] == frame.seq
+
+    def close(self):
+        # The views must go before the block can be closed
+        del self.header, self.data
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+# Computes frames into a FrameRing on a background thread, one per frame
+# interval. The frame index follows the wall clock while running, so when a
+# frame takes longer than the interval the frames in between are skipped
+# instead of queued, and a consumer that falls behind just reads the newest.
+#
+# compute(frame, elapsed, out) writes frame number `frame` into the flat
+# array out (elapsed is the number of frames since the previous computed
+# one) and returns (generation, part lengths), or None to publish nothing.
+class FrameProducer(threading.Thread):
+    def __init__(self, ring, compute, interval_ms=10):
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.compute = compute
+        self.interval = interval_ms / 1000
+        self.frame = -1
+        self.running = threading.Event()
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self._computing = threading.Lock()  # held while a frame is computed
+        self._resume_time = 0.0
+        self._resume_frame = 0
+
+    def resume(self):
+        with self.lock:
+            self._resume_time = time.perf_counter()
+            self._resume_frame = self.frame + 1
+        self.running.set()
+        if not self.is_alive():
+            self.start()
+
+    def pause(self):
+        self.running.clear()
+
+    # Keeps the producer between frames for the duration of the block, to read
+    # state that compute() changes (e.g. copy a solver's arrays)
+    @contextlib.contextmanager
+    def hold(self):
+        with self._computing:
+            yield
+
+    def shutdown(self):
+        self.stopped.set()
+        self.running.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.running.wait()
+            if self.stopped.is_set():
+                break
+            with self.lock:
+                resume_time, resume_frame = self._resume_time, self._resume_frame
+            target = resume_frame + int((time.perf_counter() - resume_time) / self.interval)
+            if target > self.frame:
+                elapsed = target - self.frame if self.frame >= 0 else 1
+                self.frame = target
+                with self._computing:
+                    seq, out = self.ring.begin_write()
+                    result = self.compute(target, elapsed, out)
+                    if result is not None:
+                        self.ring.publish(seq, *result)
+            # Sleep until the next frame is due
+            next_time = resume_time + (self.frame - resume_frame + 1) * self.interval
+            self.stopped.wait(max(0.0, next_time - time.perf_counter()))
@@ -0,0 +1,132 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+# Opt-in timing of hot functions and animation frames. When disabled, timed()
+# returns the function unchanged and frame_tick() returns immediately, so the
+# instrumentation costs nothing unless it is switched on.
+class FrameProfiler:
+    def __init__(self, enabled=False, max_events=200_000):
+        self.enabled = enabled
+        self.start_ns = time.perf_counter_ns()
+        # (name, start_ns, duration_ns, thread id), oldest dropped first
+        self.events = deque(maxlen=max_events)
+        # name -> [calls, total_ns, max_ns]
+        self.stats = {}
+        # source -> FrameMonitor
+        self.frames = {}
+        self.lock = threading.Lock()
+
+    # Decorator recording every call of the function under the given name
+    def timed(self, name):
+        def decorate(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, start, time.perf_counter_ns() - start)
+            return wrapper
+        return decorate
+
+    def wrap(self, func, name):
+        return self.timed(name)(func)
+
+    def record(self, name, start_ns, duration_ns):
+        with self.lock:
+            self.events.append((name, start_ns, duration_ns, threading.get_ident()))
+            stat = self.stats.setdefault(name, [0, 0, 0])
+            stat[0] += 1
+            stat[1] += duration_ns
+            stat[2] = max(stat[2], duration_ns)
+
+    # Called once per displayed frame of an animation running at interval_ms
+    def frame_tick(self, source, interval_ms):
+        if not self.enabled:
+            return
+        monitor = self.frames.get(source)
+        if monitor is None:
+            monitor = self.frames[source] = FrameMonitor(interval_ms)
+        monitor.tick(time.perf_counter_ns())
+
+    # Called when an animation starts or resumes, so that the pause before it
+    # is not counted as dropped frames
+    def frame_reset(self, source):
+        if not self.enabled:
+            return
+        monitor = self.frames.get(source)
+        if monitor is not None:
+            monitor.reset()
+
+    # Lines for the live overlay
+    def summary(self):
+        lines = []
+        for source, monitor in self.frames.items():
+            lines.append(f"{source}: {monitor.fps():.1f} fps (target {1000 / monitor.interval_ms:.0f}), "
+                         f"dropped {monitor.dropped}")
+        with self.lock:
+            stats = sorted(self.stats.items(), key=lambda item: -item[1][1])
+        for name, (calls, total_ns, max_ns) in stats:
+            lines.append(f"{name}: {calls} calls, avg {total_ns / calls / 1e6:.2f} ms, max {max_ns / 1e6:.2f} ms")
+        return "\n".join(lines)
+
+    # Writes the recorded calls as Chrome trace JSON (chrome://tracing, Perfetto)
+    def export_chrome_trace(self, path):
+        with self.lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = [{
+            'name': name,
+            'ph': 'X',
+            'ts': (start_ns - self.start_ns) / 1e3,
+            'dur': duration_ns / 1e3,
+            'pid': pid,
+            'tid': tid,
+        } for name, start_ns, duration_ns, tid in events]
+        for source, monitor in self.frames.items():
+            trace.append({
+                'name': f"{source} frames",
+                'ph': 'C',
+                'ts': (time.perf_counter_ns() - self.start_ns) / 1e3,
+                'pid': pid,
+                'args': {'fps': round(monitor.fps(), 2), 'dropped': monitor.dropped},
+            })
+        with open(path, 'w') as fh:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, fh)
+
+
+# Achieved frame rate over the last second and frames missed against the
+# requested interval
+class FrameMonitor:
+    def __init__(self, interval_ms):
+        self.interval_ms = interval_ms
+        self.ticks = deque()
+        self.dropped = 0
+
+    def tick(self, now_ns):
+        if self.ticks:
+            late = (now_ns - self.ticks[-1]) / 1e6 / self.interval_ms
+            # A gap of more than 1.5 intervals means at least one frame was missed
+            if late > 1.5:
+                self.dropped += int(round(late)) - 1
+        self.ticks.append(now_ns)
+        while now_ns - self.ticks[0] > 1e9:
+            self.ticks.popleft()
+
+    # Forgets the last tick (and with it the gap to the next one); the dropped
+    # count is kept
+    def reset(self):
+        self.ticks.clear()
+
+    def fps(self):
+        if len(self.ticks) < 2:
+            return 0.0
+        return (len(self.ticks) - 1) / ((self.ticks[-1] - self.ticks[0]) / 1e9)
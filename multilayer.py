@@ -0,0 +1,141 @@
+from collections import namedtuple
+
+import numpy as np
+
+from wave_physics import solve_wave_params, BOUNDARY_X
+
+
+# One layer of a stack: relative permittivity, conductivity (S/m), relative
+# permeability and thickness (m)
+Layer = namedtuple('Layer', 'epsilon_r sigma mu_r thickness')
+
+AIR = (1.0, 0.0, 1.0)
+
+
+# Propagation constant gamma = alpha + j*beta and intrinsic impedance eta,
+# broadcast over frequency and material arrays
+def propagation_constants(freq, epsilon_r, sigma, mu_r):
+    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = solve_wave_params(
+        freq, epsilon_r, sigma, mu_r)
+    return alpha + 1j * beta, eta
+
+
+# Normal incidence from air onto a stack of layers starting at x=start and
+# backed by a semi-infinite substrate. Fields are phasors of
+# Re{E(x) e^(j*omega*t)} with an incident wave of unit amplitude; within each
+# medium E(x) = A e^(-gamma x) + B e^(gamma x), and the layers are chained by
+# their transfer (characteristic) matrices. Everything is vectorized over
+# frequency; the only loop is the one over the layers.
+class LayerStack:
+    def __init__(self, layers, substrate=AIR, incident=AIR, start=BOUNDARY_X):
+        layers = np.asarray([tuple(layer) for layer in layers], dtype=float).reshape(-1, 4)
+        self.epsilon_r, self.sigma, self.mu_r, self.thickness = layers.T
+        self.substrate = tuple(substrate)
+        self.incident = tuple(incident)
+        self.start = start
+        # Left edge of every layer, then the start of the substrate
+        self.interfaces = start + np.concatenate(([0.0], np.cumsum(self.thickness)))
+
+    # Solves the stack at the given frequencies (any shape). Returns a dict with
+    # the reflection and transmission coefficients r and t, the reflectance R
+    # and transmittance T, and the per-layer data the field evaluation needs.
+    def solve(self, freq):
+        freq = np.asarray(freq, dtype=float)
+        f = freq[..., None]
+        gamma, eta = propagation_constants(f, self.epsilon_r, self.sigma, self.mu_r)
+        gamma_0, eta_0 = propagation_constants(freq, *self.incident)
+        gamma_s, eta_s = propagation_constants(freq, *self.substrate)
+
+        # Walk from the substrate back to the incident side carrying the
+        # tangential [E, H] at each interface. Vectors are renormalized at every
+        # layer (scale kept as a log) so thick lossy stacks cannot overflow.
+        n_layers = len(self.thickness)
+        e = np.ones(freq.shape, dtype=complex)
+        h = 1 / eta_s
+        log_scale = np.zeros(freq.shape)
+        e_edges = np.empty(freq.shape + (n_layers + 1,), dtype=complex)
+        h_edges = np.empty_like(e_edges)
+        log_edges = np.empty(freq.shape + (n_layers + 1,))
+        e_edges[..., n_layers], h_edges[..., n_layers], log_edges[..., n_layers] = e, h, log_scale
+        for i in range(n_layers - 1, -1, -1):
+            gd = gamma[..., i] * self.thickness[i]
+            cosh, sinh = np.cosh(gd), np.sinh(gd)
+            e, h = cosh * e + eta[..., i] * sinh * h, sinh / eta[..., i] * e + cosh * h
+            scale = np.maximum(np.abs(e), np.abs(h * eta[..., i]))
+            e, h = e / scale, h / scale
+            log_scale = log_scale + np.log(scale)
+            e_edges[..., i], h_edges[..., i], log_edges[..., i] = e, h, log_scale
+
+        # Split the field at the first interface into incident and reflected waves
+        incident = (e + eta_0 * h) / 2
+        reflected = (e - eta_0 * h) / 2
+        r = reflected / incident
+
+        # Rescale every interface so that the incident wave has unit amplitude
+        rescale = np.exp(log_edges - log_edges[..., :1]) / incident[..., None]
+        e_edges = e_edges * rescale
+        h_edges = h_edges * rescale
+        t = e_edges[..., n_layers]
+
+        R = np.abs(r) ** 2
+        T = np.abs(t) ** 2 * (1 / eta_s).real / (1 / eta_0).real
+        return {
+            'r': r, 't': t, 'R': R, 'T': T,
+            'gamma': gamma, 'eta': eta, 'gamma_0': gamma_0, 'gamma_s': gamma_s,
+            'e_edges': e_edges, 'h_edges': h_edges,
+        }
+
+    # Reflectance and transmittance spectra over an array of frequencies
+    def spectrum(self, freqs):
+        solution = self.solve(freqs)
+        return solution['R'], solution['T']
+
+    # E and H phasors at every x (1D array), for each frequency: the result has
+    # shape freq.shape + x.shape. All points are evaluated in one pass by
+    # gathering the layer data of the medium each point lies in.
+    def field_phasors(self, x, freq, solution=None):
+        x = np.asarray(x, dtype=float)
+        freq = np.asarray(freq, dtype=float)
+        solution = solution or self.solve(freq)
+        n_layers = len(self.thickness)
+        e_edges, h_edges = solution['e_edges'], solution['h_edges']
+        expand = (Ellipsis, None)
+
+        # 0 = incident medium, 1..n_layers = layers, n_layers + 1 = substrate
+        region = np.searchsorted(self.interfaces, x, side='right')
+        e_field = np.empty(freq.shape + x.shape, dtype=complex)
+        h_field = np.empty_like(e_field)
+
+        before = region == 0
+        if before.any():
+            gamma_0 = solution['gamma_0'][expand]
+            eta_0 = propagation_constants(freq, *self.incident)[1][expand]
+            s = x[before] - self.interfaces[0]
+            forward = np.exp(-gamma_0 * s)
+            backward = solution['r'][expand] * np.exp(gamma_0 * s)
+            e_field[..., before] = forward + backward
+            h_field[..., before] = (forward - backward) / eta_0
+
+        inside = (region > 0) & (region <= n_layers)
+        if inside.any():
+            layer = region[inside] - 1
+            gamma = solution['gamma'][..., layer]
+            eta = solution['eta'][..., layer]
+            s = x[inside] - self.interfaces[layer]
+            d = self.thickness[layer]
+            # Forward wave referenced to the left edge, backward wave to the
+            # right edge, so neither exponential can grow
+            forward = (e_edges[..., layer] + eta * h_edges[..., layer]) / 2 * np.exp(-gamma * s)
+            backward = (e_edges[..., layer + 1] - eta * h_edges[..., layer + 1]) / 2 * np.exp(-gamma * (d - s))
+            e_field[..., inside] = forward + backward
+            h_field[..., inside] = (forward - backward) / eta
+
+        after = region > n_layers
+        if after.any():
+            gamma_s, eta_s = propagation_constants(freq, *self.substrate)
+            s = x[after] - self.interfaces[-1]
+            forward = solution['t'][expand] * np.exp(-gamma_s[expand] * s)
+            e_field[..., after] = forward
+            h_field[..., after] = forward / eta_s[expand]
+
+        return e_field, h_field
@@ -0,0 +1,135 @@
+import numpy as np
+
+from wave_physics import EPSILON_0, MU_0, BOUNDARY_X
+
+
+# Oblique incidence from air onto the lossy half-space x > BOUNDARY_X. The
+# plane of incidence is x-z and the angle is measured from the boundary
+# normal (the x axis), in radians. Fields are phasors of Re{F e^(j*omega*t)}
+# with waves e^(-j(kx*x + kz*z)); tangential phase matching fixes kz for
+# every wave, so the transmitted wave is inhomogeneous: it decays along x
+# only (planes of constant amplitude parallel to the boundary) while its
+# planes of constant phase are tilted by the real refraction angle.
+#
+# TE: E along y (perpendicular to the plane of incidence). TM: H along y;
+# r_tm and t_tm are ratios of the tangential H amplitudes, so that at normal
+# incidence r_tm = -r_te.
+
+# Normal component of the wavevector from k^2 - kz^2, taking the root that
+# decays (or, without loss, propagates) towards +x
+def normal_wavenumber(kx_squared):
+    kx = np.sqrt(np.asarray(kx_squared, dtype=complex))
+    return np.where((kx.imag > 0) | ((kx.imag == 0) & (kx.real < 0)), -kx, kx)
+
+
+# Air/lossy-dielectric boundary for plane waves at any angle. Every method is
+# vectorized: freq, angle and the material arguments broadcast against each
+# other, so a whole angle x frequency map is one call.
+class ObliqueBoundary:
+    def __init__(self, epsilon_r, sigma, mu_r, boundary=BOUNDARY_X):
+        self.epsilon_r = np.asarray(epsilon_r, dtype=float)
+        self.sigma = np.asarray(sigma, dtype=float)
+        self.mu_r = np.asarray(mu_r, dtype=float)
+        self.boundary = boundary
+
+    # Solves the boundary at the given frequencies and angles. Returns a dict
+    # with the Fresnel coefficients (r_te, t_te, r_tm, t_tm), the reflectances
+    # and transmittances (R_te, T_te, R_tm, T_tm: power through the boundary,
+    # so R + T = 1), the wavevector components (kz, k1x in air, k2x in the
+    # dielectric), the complex transmission angle, and the real angle,
+    # phase constant and normal attenuation of the transmitted wave.
+    def solve(self, freq, angle):
+        freq, angle = np.broadcast_arrays(np.asarray(freq, dtype=float), np.asarray(angle, dtype=float))
+        k1 = 2 * np.pi * freq * np.sqrt(MU_0 * EPSILON_0)
+        cos, sin = np.cos(angle), np.sin(angle)
+        epsilon_2 = self.relative_permittivity(freq)
+        r_te, t_te, r_tm, t_tm, q = self._coefficients(epsilon_2, cos, sin)
+
+        # Power crossing the boundary per unit area, relative to the incident
+        with np.errstate(divide='ignore', invalid='ignore'):
+            T_te = np.abs(t_te) ** 2 * (q / self.mu_r).real / cos
+            T_tm = np.abs(t_tm) ** 2 * (q / epsilon_2).real / cos
+            sin_t = sin / np.sqrt(self.mu_r * epsilon_2)
+
+        k2x = k1 * q
+        kz = k1 * sin
+        return {
+            'r_te': r_te, 't_te': t_te, 'r_tm': r_tm, 't_tm': t_tm,
+            'R_te': np.abs(r_te) ** 2, 'T_te': T_te, 'R_tm': np.abs(r_tm) ** 2, 'T_tm': T_tm,
+            'kz': kz, 'k1x': k1 * cos, 'k2x': k2x,
+            'transmission_angle': np.arcsin(sin_t),
+            'refraction_angle': np.arctan2(kz, k2x.real),
+            'phase_constant': np.hypot(kz, k2x.real),
+            'attenuation': -k2x.imag,
+        }
+
+    # (R_te, R_tm) over angles x frequencies: both 1D, the result is
+    # (len(angles), len(freqs)), for scalar material arguments. Only the
+    # reflection coefficients are evaluated on the full grid.
+    def reflectance_map(self, angles, freqs):
+        angles = np.asarray(angles, dtype=float)[:, None]
+        epsilon_2 = self.relative_permittivity(np.asarray(freqs, dtype=float))[None, :]
+        r_te, t_te, r_tm, t_tm, q = self._coefficients(epsilon_2, np.cos(angles), np.sin(angles))
+        return r_te.real ** 2 + r_te.imag ** 2, r_tm.real ** 2 + r_tm.imag ** 2
+
+    # Relative complex permittivity epsilon_r - j*sigma/(omega*epsilon_0)
+    def relative_permittivity(self, freq):
+        return self.epsilon_r - 1j * self.sigma / (2 * np.pi * freq * EPSILON_0)
+
+    # Fresnel coefficients from everything normalized to the wavenumber of
+    # air (mu_1 = epsilon_1 = 1): q = k2x / k1 = sqrt(mu_2*epsilon_2 - sin^2)
+    def _coefficients(self, epsilon_2, cos, sin):
+        mu_2 = self.mu_r
+        q = normal_wavenumber(mu_2 * epsilon_2 - sin ** 2)
+        te = mu_2 * cos + q
+        tm = epsilon_2 * cos + q
+        r_te = (mu_2 * cos - q) / te
+        r_tm = (epsilon_2 * cos - q) / tm
+        t_te = 2 * mu_2 * cos / te
+        t_tm = 2 * epsilon_2 * cos / tm
+        return r_te, t_te, r_tm, t_tm, q
+
+    # Phasor of the field component normal to the plane of incidence at the
+    # points (x, z) for one frequency and angle: E_y for TE, and ETA_0*H_y for
+    # TM, both for an incident wave of unit amplitude whose phase is zero at
+    # (boundary, 0). x and z broadcast against each other (e.g. a column and
+    # a row for a grid).
+    def field_phasors(self, x, z, freq, angle, polarization='TE', solution=None):
+        solution = solution or self.solve(freq, angle)
+        r, t = (solution['r_te'], solution['t_te']) if polarization == 'TE' else (solution['r_tm'], solution['t_tm'])
+        s = np.asarray(x, dtype=float) - self.boundary
+        along = np.exp(-1j * solution['kz'] * np.asarray(z, dtype=float))
+        k1x, k2x = solution['k1x'], solution['k2x']
+        # Keep the exponents from overflowing on the side where a wave is not
+        # evaluated (e.g. a strongly attenuated wave far back in the air)
+        air = np.exp(-1j * k1x * np.minimum(s, 0)) + r * np.exp(1j * k1x * np.minimum(s, 0))
+        dielectric = t * np.exp(-1j * k2x * np.maximum(s, 0))
+        return np.where(s <= 0, air, dielectric) * along
+
+
+# Animated map of the out-of-plane field over the x-z plane. The phasor of
+# every pixel is computed once per parameter set; a frame is then
+# Re{phasor * e^(j*omega*t)}, i.e. two float32 multiplies into a buffer that
+# an imshow artist takes as is. Build a new map whenever the inputs change.
+class FieldMap:
+    def __init__(self, boundary, freq, angle, amplitude=1.0, polarization='TE',
+                 x_range=(0.0, 5.0), z_range=(-2.5, 2.5), shape=(512, 512)):
+        self.omega = 2 * np.pi * freq
+        self.extent = (x_range[0], x_range[1], z_range[0], z_range[1])
+        x = np.linspace(x_range[0], x_range[1], shape[1])
+        z = np.linspace(z_range[0], z_range[1], shape[0])
+        # Rows are z, columns x, as imshow expects with origin='lower'
+        phasors = amplitude * boundary.field_phasors(x[None, :], z[:, None], freq, angle, polarization)
+        self.peak = float(np.abs(phasors).max())
+        self._real = np.ascontiguousarray(phasors.real, dtype=np.float32)
+        self._imag = np.ascontiguousarray(phasors.imag, dtype=np.float32)
+        self._buffer = np.empty(shape, dtype=np.float32)
+        self._work = np.empty(shape, dtype=np.float32)
+
+    # The field at the given time, in a buffer overwritten on the next call
+    def frame(self, time):
+        angle = self.omega * time
+        np.multiply(self._real, np.float32(np.cos(angle)), out=self._buffer)
+        np.multiply(self._imag, np.float32(np.sin(angle)), out=self._work)
+        self._buffer -= self._work
+        return self._buffer
@@ -0,0 +1,135 @@
+import numpy as np
+
+from fdtd import pulse_waveform
+from wave_physics import solve_wave_params, air_phase_constant, ETA_AIR, BOUNDARY_X, B_FIELD_SCALE
+
+
+PULSE_SAMPLES = 4096  # Time samples of the synthesis window (2049 rfft bins)
+SAMPLES_PER_PERIOD = 8  # Time samples per carrier period; both pulse spectra end below 2x the carrier
+SPECTRUM_FLOOR = 1e-6  # Bins below this fraction of the spectral peak are skipped
+TAIL_FLOOR = 1e-2  # Playback covers the samples where the field somewhere exceeds this fraction of the amplitude
+
+
+# Baseband Gaussian pulse; same width and delay as the modulated one
+def gaussian_waveform(tau, omega, periods=1.5):
+    width = periods * 2 * np.pi / omega
+    delay = 4 * width
+    return np.exp(-((tau - delay) / width) ** 2)
+
+PULSE_SHAPES = {'gaussian': gaussian_waveform, 'modulated': pulse_waveform}
+
+
+# Wideband propagation by frequency-domain synthesis: the source pulse at
+# x=0 is transformed once with rfft, every bin is carried to every x with
+# the propagation factor of its own frequency (e^(-j*beta_0*x) in air, then
+# e^(-gamma(omega)*(x - 1)) in the dielectric, amplitude continuous at the
+# boundary as in the analytic view), and one batched irfft per field gives
+# the whole space-time history. Frames are then columns of that history, so
+# the pulse spreads and attenuates exactly as the dispersion dictates.
+#
+# Only bins that carry part of the pulse spectrum are evaluated, and the
+# spectrum and history buffers are allocated once and refilled by every
+# solve(). The playback interface (advance, positions, fields) is the one
+# of FDTD1D, so the GUI drives both engines the same way.
+class WidebandPulse:
+    def __init__(self, x_air, x_dielectric, n_samples=PULSE_SAMPLES):
+        self.x_air = np.asarray(x_air, dtype=float)
+        self.x_dielectric = np.asarray(x_dielectric, dtype=float)
+        self.n_samples = n_samples
+        n_air, n_x = len(self.x_air), len(self.x_air) + len(self.x_dielectric)
+        self._splits = [n_air, n_x, n_x + n_air]
+        n_bins = n_samples // 2 + 1
+        # Spectrum and space-time histories have one row per x, so the batched
+        # transforms run along contiguous rows
+        self._spectrum = np.zeros((n_x, n_bins), dtype=complex)
+        self._active = np.arange(0)
+        self.e = np.zeros((n_x, n_samples))
+        self.b = np.zeros((n_x, n_samples))
+        self._frame = np.zeros(2 * n_x)
+        self.dt = 1.0
+        self.loop = (0, n_samples - 1)  # First and last sample of the playback loop
+        self.time = 0.0
+
+    # Synthesizes the history for a new parameter set and restarts playback.
+    # material (a DispersionTable) overrides epsilon_r and sigma per bin.
+    def solve(self, freq, amplitude, epsilon_r, sigma, mu_r, shape='modulated', material=None):
+        self.dt = 1 / (SAMPLES_PER_PERIOD * freq)
+        source = amplitude * PULSE_SHAPES[shape](np.arange(self.n_samples) * self.dt, 2 * np.pi * freq)
+        spectrum = np.fft.rfft(source)
+        active = np.flatnonzero(np.abs(spectrum) > SPECTRUM_FLOOR * np.abs(spectrum).max())
+
+        # DC is evaluated just above zero, where every material is regular
+        bin_freqs = np.fft.rfftfreq(self.n_samples, self.dt)[active]
+        bin_freqs[bin_freqs == 0] = 1e-3 / (self.n_samples * self.dt)
+        if material is not None:
+            epsilon_r, sigma = material(bin_freqs)
+        omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = solve_wave_params(
+            bin_freqs, epsilon_r, sigma, mu_r)
+
+        n_air = len(self.x_air)
+        s = spectrum[active]
+        beta_0 = air_phase_constant(omega)
+        air = s * np.exp(-1j * beta_0 * self.x_air[:, None])
+        dielectric = s * np.exp(-1j * beta_0 * BOUNDARY_X) * np.exp(
+            -(alpha + 1j * beta) * (self.x_dielectric[:, None] - BOUNDARY_X))
+
+        # Clear the bins of the previous solve and fill the active ones with
+        # E, then turn them into B (the convention of FieldCache: conj(1/eta)
+        # times E) for the second transform
+        self._spectrum[:, self._active] = 0
+        self._active = active
+        self._spectrum[:n_air, active] = air
+        self._spectrum[n_air:, active] = dielectric
+        np.fft.irfft(self._spectrum, self.n_samples, out=self.e)
+        self._spectrum[:n_air, active] = air * (B_FIELD_SCALE / ETA_AIR)
+        self._spectrum[n_air:, active] = dielectric * (B_FIELD_SCALE * np.conj(1 / eta))
+        np.fft.irfft(self._spectrum, self.n_samples, out=self.b)
+
+        # Play back only from the arrival of the pulse until it has left (or
+        # died out in) the domain
+        alive = np.flatnonzero(np.abs(self.e).max(axis=0) > TAIL_FLOOR * amplitude)
+        if len(alive):
+            self.loop = (max(0, int(alive[0]) - 1), min(self.n_samples - 1, int(alive[-1]) + 1))
+        else:
+            self.loop = (0, self.n_samples - 1)
+        self.time = self.loop[0] * self.dt
+
+    # Synthesized history and playback position for session files: (plain
+    # values, arrays)
+    def snapshot(self):
+        return {'dt': self.dt, 'loop': list(self.loop), 'time': self.time}, {'e': self.e, 'b': self.b}
+
+    # Takes over a snapshot instead of solving again; the grid must match
+    def restore(self, info, arrays):
+        np.copyto(self.e, arrays['e'])
+        np.copyto(self.b, arrays['b'])
+        self.dt = info['dt']
+        self.loop = tuple(info['loop'])
+        self.time = info['time']
+
+    # Advances playback by duration seconds, looping over the pulse's
+    # passage. max_steps is accepted for compatibility with FDTD1D: a
+    # frame costs the same however far it jumps.
+    def advance(self, duration, max_steps=None):
+        start, end = self.loop[0] * self.dt, self.loop[1] * self.dt
+        self.time = start + (self.time + duration - start) % (end - start)
+
+    # Positions of the plotted curves: (x_e_air, x_h_air, x_e_dielectric, x_h_dielectric)
+    def positions(self):
+        return self.x_air, self.x_air, self.x_dielectric, self.x_dielectric
+
+    # (e_air, b_air, e_dielectric, b_dielectric) at the current time,
+    # interpolated between the two nearest samples. The arrays are views
+    # into a buffer that is overwritten on the next call.
+    def fields(self):
+        position = self.time / self.dt
+        index = min(int(position), self.n_samples - 2)
+        weight = position - index
+        n_x = self.e.shape[0]
+        for row, history in enumerate((self.e, self.b)):
+            frame = self._frame[row * n_x:(row + 1) * n_x]
+            np.multiply(history[:, index], 1 - weight, out=frame)
+            frame += weight * history[:, index + 1]
+        # Stored as [e_air e_dielectric b_air b_dielectric]; return in curve order
+        e_air, e_dielectric, b_air, b_dielectric = np.split(self._frame, self._splits)
+        return e_air, b_air, e_dielectric, b_dielectric
@@ -0,0 +1,124 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from session import create_session, save_session, load_session, SESSION_EXTENSION
+
+
+# Recordings of the animated curves, for runs far longer than memory holds
+# (e.g. 10^6 frames of 10^4 points). A recording is a directory with a small
+# index session file (the positions of the points, the frame layout and the
+# frame count) and chunk session files of CHUNK_BYTES each, holding a block
+# of frames and their times. Frames are written straight into the mapped
+# chunk, so memory stays at one chunk of dirty pages whatever the length,
+# and reading a frame back maps its chunk and touches only that frame's rows.
+INDEX_NAME = 'recording' + SESSION_EXTENSION
+CHUNK_BYTES = 64 * 2 ** 20  # Frame data per chunk file
+MAPPED_CHUNKS = 4  # Chunks a Recording keeps mapped at once
+
+
+def chunk_path(directory, index):
+    return os.path.join(directory, f'chunk_{index:06d}{SESSION_EXTENSION}')
+
+
+# Appends frames to a new recording in directory. positions are the x arrays
+# of the parts of a frame (e.g. the four curves), which every frame repeats
+# in the same order; state is stored with the recording as plain values.
+# The index is rewritten whenever a chunk is complete, so after a crash only
+# the frames of the last chunk are lost. append() and close() may be called
+# from different threads.
+class FrameRecorder:
+    def __init__(self, directory, positions, state=None, dtype=np.float32, chunk_bytes=CHUNK_BYTES):
+        if sum(len(x) for x in positions) == 0:
+            raise ValueError("a recording needs at least one point per frame")
+        if os.path.exists(os.path.join(directory, INDEX_NAME)):
+            raise FileExistsError(f"{directory} already holds a recording")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.x = np.concatenate([np.asarray(x, dtype=float) for x in positions])
+        self.lengths = [len(x) for x in positions]
+        self.state = state or {}
+        self.dtype = np.dtype(dtype)
+        # At least one frame per chunk, also for frames larger than chunk_bytes
+        self.chunk_frames = max(1, chunk_bytes // (len(self.x) * self.dtype.itemsize))
+        self.frames = 0
+        self.closed = False
+        self._lock = threading.Lock()
+        self._chunk = None
+        self._write_index()
+
+    def _write_index(self):
+        save_session(os.path.join(self.directory, INDEX_NAME),
+                     {'kind': 'recording', 'frames': self.frames, 'chunk_frames': self.chunk_frames,
+                      'lengths': self.lengths, 'dtype': self.dtype.str, 'state': self.state},
+                     {'x': self.x})
+
+    # Adds one frame: its time and the parts in the order of positions
+    def append(self, time, parts):
+        with self._lock:
+            if self.closed:
+                return
+            row = self.frames % self.chunk_frames
+            if row == 0:
+                self._chunk = create_session(
+                    chunk_path(self.directory, self.frames // self.chunk_frames), {},
+                    {'fields': (self.dtype, (self.chunk_frames, len(self.x))),
+                     'times': (np.float64, (self.chunk_frames,))})
+            np.concatenate(parts, out=self._chunk['fields'][row], casting='same_kind')
+            self._chunk['times'][row] = time
+            self.frames += 1
+            if row == self.chunk_frames - 1:
+                self._finish_chunk()
+
+    def _finish_chunk(self):
+        for array in self._chunk.values():
+            array.flush()
+        self._chunk = None
+        self._write_index()
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._chunk is not None:
+                self._finish_chunk()
+
+
+# Read side of a recording. Chunks are mapped on demand (the last
+# MAPPED_CHUNKS stay mapped), so seeking anywhere in a recording of any
+# length costs one small file open and the pages of the frames read.
+class Recording:
+    def __init__(self, directory):
+        info, arrays = load_session(os.path.join(directory, INDEX_NAME))
+        if info.get('kind') != 'recording':
+            raise ValueError(f"{directory} does not hold a recording")
+        self.directory = directory
+        self.frames = info['frames']
+        self.chunk_frames = info['chunk_frames']
+        self.state = info['state']
+        self._splits = np.cumsum(info['lengths'])[:-1]
+        self.positions = np.split(np.array(arrays['x']), self._splits)
+        self._chunks = OrderedDict()
+
+    def __len__(self):
+        return self.frames
+
+    def _chunk(self, index):
+        if index in self._chunks:
+            self._chunks.move_to_end(index)
+        else:
+            self._chunks[index] = load_session(chunk_path(self.directory, index))[1]
+            if len(self._chunks) > MAPPED_CHUNKS:
+                self._chunks.popitem(last=False)
+        return self._chunks[index]
+
+    # (time, parts) of frame number frame; the parts are views of the file
+    def frame(self, frame):
+        if not 0 <= frame < self.frames:
+            raise IndexError(f"frame {frame} out of range for {self.frames} frames")
+        chunk = self._chunk(frame // self.chunk_frames)
+        row = frame % self.chunk_frames
+        return float(chunk['times'][row]), np.split(chunk['fields'][row], self._splits)
@@ -0,0 +1,89 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+
+# Session files: a small JSON header with the state (plain values) and the
+# layout of any number of arrays, followed by the raw array data. Every array
+# section starts on an ALIGNMENT boundary, so loading maps the sections with
+# np.memmap instead of reading them: a file holding a large sweep or a long
+# FDTD state opens instantly, and only the pages actually used are read.
+#
+# Layout: MAGIC, header length (uint64, little endian), header (UTF-8 JSON),
+# padding, then the sections at header['arrays'][name]['offset'] bytes from
+# the first aligned position after the header.
+MAGIC = b'EMWSESS1'
+VERSION = 1
+ALIGNMENT = 64
+SESSION_EXTENSION = '.emws'
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+def _map_array(path, meta, data_start, mode):
+    dtype = np.dtype(meta['dtype'])
+    shape = tuple(meta['shape'])
+    if int(np.prod(shape)) == 0:
+        return np.zeros(shape, dtype=dtype)  # np.memmap cannot map zero bytes
+    return np.memmap(path, dtype=dtype, mode=mode, offset=data_start + meta['offset'], shape=shape)
+
+# Creates a session file with room for the given arrays ({name: (dtype,
+# shape)}) and returns {name: writable memmap}. Fill them (e.g. chunk by
+# chunk, for results larger than memory) and flush; the file is complete
+# as soon as it is created.
+def create_session(path, state, specs):
+    arrays = {}
+    end = 0
+    for name, (dtype, shape) in specs.items():
+        dtype = np.dtype(dtype)
+        shape = [int(n) for n in np.atleast_1d(shape)]
+        arrays[name] = {'dtype': dtype.str, 'shape': shape, 'offset': end}
+        end = _aligned(end + int(np.prod(shape)) * dtype.itemsize)
+    header = json.dumps({'version': VERSION, 'state': state, 'arrays': arrays}).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.truncate(data_start + end)
+    return {name: _map_array(path, meta, data_start, 'r+') for name, meta in arrays.items()}
+
+# Writes state and arrays ({name: array}) to path. The file is written
+# next to path first and moved into place, so an existing session is never
+# left half overwritten.
+def save_session(path, state, arrays=None):
+    arrays = {name: np.asarray(array) for name, array in (arrays or {}).items()}
+    temporary = path + '.tmp'
+    try:
+        maps = create_session(temporary, state, {name: (array.dtype, array.shape) for name, array in arrays.items()})
+        for name, array in arrays.items():
+            maps[name][...] = array
+            if isinstance(maps[name], np.memmap):
+                maps[name].flush()
+        # The maps must go before the file can be moved on every platform
+        maps.clear()
+        os.replace(temporary, path)
+    except BaseException:
+        maps = None
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+# Reads a session file. Returns (state, {name: array}) where the arrays are
+# memmaps of the file (read-only by default; mode='c' gives copy-on-write
+# arrays, 'r+' writes through to the file).
+def load_session(path, mode='r'):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a session file")
+        header_length, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    if header['version'] > VERSION:
+        raise ValueError(f"{path} was written by a newer version (format {header['version']})")
+    data_start = _aligned(len(MAGIC) + 8 + header_length)
+    arrays = {name: _map_array(path, meta, data_start, mode) for name, meta in header['arrays'].items()}
+    return header['state'], arrays
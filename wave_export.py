@@ -0,0 +1,247 @@
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+from multiprocessing import Pool
+
+import numpy as np
+import matplotlib
+from matplotlib import style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from wave_physics import calculate_wave_params, format_frequency, FieldCache, adaptive_grid, MAX_SEGMENT_POINTS_3D
+
+
+# Simulated time between consecutive frames, matching the Tk animations
+FRAME_TIME_2D = 1e-10
+FRAME_TIME_3D = 2 * np.pi / 99 * 3e-9
+
+FRAME_PATTERN = "frame_%05d.png"
+EXPORT_FORMATS = ('mp4', 'gif', 'png')
+
+
+# Wave parameters for the figures; raises ValueError for inputs without a
+# propagating solution (e.g. a zero frequency)
+def wave_params(freq, epsilon_r, sigma, mu_r):
+    params = calculate_wave_params(freq, epsilon_r, sigma, mu_r)
+    if None in params or not np.all(np.isfinite(params[:3])):
+        raise ValueError(f"No wave solution for freq={freq}, epsilon_r={epsilon_r}, sigma={sigma}, mu_r={mu_r}")
+    return params
+
+
+# Builds the 2D view of the main window on an Agg canvas. Returns the figure
+# and a function that draws frame i into it.
+def build_2d_figure(freq, amplitude, epsilon_r, sigma, mu_r):
+    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = wave_params(freq, epsilon_r, sigma, mu_r)
+    cache = FieldCache(*adaptive_grid(omega, beta, alpha), amplitude, omega, beta, alpha, eta)
+
+    with style.context('dark_background'):
+        fig = Figure(figsize=(13, 7))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        ax.set_xlim(0, 5)
+        ax.set_ylim(-1.5, 1.5)
+        ax.set_title(f"Electromagnetic Wave in Lossy Dielectric (f={format_frequency(freq)})", color='white')
+        ax.set_xlabel("Distance (m)", color='white')
+        ax.set_ylabel("Field Amplitude", color='white')
+        ax.tick_params(colors='white')
+
+        e_line1, = ax.plot([], [], lw=2, color='cyan', label='E-field (Air)')
+        e_line2, = ax.plot([], [], lw=2, color='orange', label='E-field (Lossy Dielectric)')
+        b_line1, = ax.plot([], [], lw=2, color='green', label='B-field (Air)')
+        b_line2, = ax.plot([], [], lw=2, color='red', label='B-field (Lossy Dielectric)')
+        ax.plot(cache.x_dielectric, cache.envelope, lw=2, color='magenta', label='Attenuated Amplitude', linestyle='--')
+        ax.plot([1 + skin_depth, 1 + skin_depth], [-1.5, 1.5], lw=2, color='yellow', linestyle='--', label='Skin Depth')
+        ax.plot([1, 1], [-1.5, 1.5], lw=2, color='white', linestyle='--', label='Boundary')
+        ax.legend(loc='upper right')
+
+    def draw_frame(i):
+        y_e1, y_b1, y_e2, y_b2 = cache.fields(i * FRAME_TIME_2D)
+        e_line1.set_data(cache.x_air, y_e1)
+        e_line2.set_data(cache.x_dielectric, y_e2)
+        b_line1.set_data(cache.x_air, y_b1)
+        b_line2.set_data(cache.x_dielectric, y_b2)
+
+    return fig, draw_frame
+
+# Builds the 3D view of the 3D window on an Agg canvas. Returns the figure
+# and a function that draws frame i into it.
+def build_3d_figure(freq, amplitude, epsilon_r, sigma, mu_r):
+    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = wave_params(freq, epsilon_r, sigma, mu_r)
+    x1, x2 = adaptive_grid(omega, beta, alpha, max_points=MAX_SEGMENT_POINTS_3D)
+    cache = FieldCache(x1, x2, amplitude, omega, beta, alpha, eta)
+    zeros1 = np.zeros_like(x1)
+    zeros2 = np.zeros_like(x2)
+
+    with style.context('dark_background'):
+        fig = Figure(figsize=(10, 8))
+        FigureCanvasAgg(fig)
+        ax_3d = fig.add_subplot(111, projection='3d')
+
+        # Create boundary plane
+        xx, zz = np.meshgrid(np.linspace(-3, 3, 10), np.linspace(-3, 3, 10))
+        yy = np.ones_like(xx)
+        ax_3d.plot_surface(yy, xx, zz, alpha=0.3, color='gray', edgecolor='white', linewidth=0.5)
+
+        ax_3d.plot(x2, zeros2, cache.envelope, 'magenta', label='Attenuated Amplitude', linestyle='--', linewidth=2)
+        if not np.isinf(skin_depth):
+            ax_3d.plot([1 + skin_depth, 1 + skin_depth], [-1.5, 1.5], [-1.5, 1.5], 'yellow', linestyle='--',
+                       label='Skin Depth', linewidth=2)
+
+        e_line1, = ax_3d.plot([], [], [], color='cyan', label='E-field (Air)', linewidth=2)
+        e_line2, = ax_3d.plot([], [], [], color='orange', label='E-field (Lossy Dielectric)', linewidth=2)
+        b_line1, = ax_3d.plot([], [], [], color='green', label='B-field (Air)', linewidth=2)
+        b_line2, = ax_3d.plot([], [], [], color='red', label='B-field (Lossy Dielectric)', linewidth=2)
+
+        ax_3d.set_xlabel('X (Distance)')
+        ax_3d.set_ylabel('Y (B-field)')
+        ax_3d.set_zlabel('Z (E-field)')
+        ax_3d.set_title(f'3D Electromagnetic Wave (f={format_frequency(freq)})')
+        ax_3d.set_box_aspect([4, 2, 2])
+        ax_3d.view_init(elev=30, azim=-120)
+        ax_3d.set_xlim(0, 5)
+        ax_3d.set_ylim(-3, 3)
+        ax_3d.set_zlim(-3, 3)
+        ax_3d.grid(True, linestyle='--', alpha=0.3)
+        ax_3d.legend(loc='upper right')
+
+    def draw_frame(i):
+        z1, y1, z2, y2 = cache.fields(i * FRAME_TIME_3D)
+        e_line1.set_data(x1, zeros1)
+        e_line1.set_3d_properties(z1)
+        e_line2.set_data(x2, zeros2)
+        e_line2.set_3d_properties(z2)
+        b_line1.set_data(x1, y1)
+        b_line1.set_3d_properties(zeros1)
+        b_line2.set_data(x2, y2)
+        b_line2.set_3d_properties(zeros2)
+
+    return fig, draw_frame
+
+
+FIGURE_BUILDERS = {'2d': build_2d_figure, '3d': build_3d_figure}
+
+# Per-process figure, built once by the pool initializer and reused for
+# every chunk of frames the worker renders
+_worker = {}
+
+def _init_worker(view, params, frame_dir, dpi):
+    fig, draw_frame = FIGURE_BUILDERS[view](*params)
+    _worker.update(fig=fig, draw_frame=draw_frame, frame_dir=frame_dir, dpi=dpi)
+
+def _render_chunk(frames):
+    fig = _worker['fig']
+    for i in frames:
+        _worker['draw_frame'](i)
+        fig.savefig(os.path.join(_worker['frame_dir'], FRAME_PATTERN % i), dpi=_worker['dpi'],
+                    facecolor=fig.get_facecolor())
+    return len(frames)
+
+# Renders frames 0..n_frames-1 of a view to numbered PNGs in frame_dir, in a
+# pool of worker processes (one per core by default)
+def render_frames(view, params, n_frames, frame_dir, dpi=100, workers=None, progress=None):
+    workers = workers or os.cpu_count() or 1
+    # Several chunks per worker keep the pool balanced
+    chunk = max(1, -(-n_frames // (workers * 4)))
+    chunks = [range(start, min(start + chunk, n_frames)) for start in range(0, n_frames, chunk)]
+    done = 0
+    with Pool(workers, initializer=_init_worker, initargs=(view, params, frame_dir, dpi)) as pool:
+        for count in pool.imap_unordered(_render_chunk, chunks):
+            done += count
+            if progress:
+                progress(done, n_frames)
+
+def find_ffmpeg():
+    ffmpeg = shutil.which(matplotlib.rcParams['animation.ffmpeg_path'])
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found; MP4 export needs ffmpeg on the PATH")
+    return ffmpeg
+
+# Stitches the numbered PNGs in frame_dir, in frame order, into a video
+def stitch_mp4(frame_dir, output, fps):
+    ffmpeg = find_ffmpeg()
+    subprocess.run([
+        ffmpeg, '-y', '-loglevel', 'error', '-framerate', str(fps),
+        '-i', os.path.join(frame_dir, FRAME_PATTERN),
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+        # yuv420p needs even dimensions
+        '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+        output,
+    ], check=True)
+
+def stitch_gif(frame_dir, output, fps, n_frames):
+    from PIL import Image
+
+    def frames():
+        for i in range(1, n_frames):
+            with Image.open(os.path.join(frame_dir, FRAME_PATTERN % i)) as image:
+                yield image.convert('RGB')
+
+    with Image.open(os.path.join(frame_dir, FRAME_PATTERN % 0)) as first:
+        first.convert('RGB').save(output, save_all=True, append_images=frames(),
+                                  duration=round(1000 / fps), loop=0)
+
+# Exports an animation of a view for one parameter set as MP4, GIF or a PNG
+# sequence (output is then a directory). The format, ffmpeg for MP4 and the
+# inputs are checked before any frame is rendered.
+def export_animation(output, view='2d', fmt=None, n_frames=1000, fps=30,
+                     freq=1.5e8, amplitude=1.0, epsilon_r=1.0, sigma=0.01, mu_r=1.0,
+                     dpi=100, workers=None, progress=None):
+    fmt = fmt or os.path.splitext(output)[1].lstrip('.').lower() or 'png'
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}; use one of {', '.join(EXPORT_FORMATS)}")
+    if n_frames < 1:
+        raise ValueError(f"Export needs at least one frame, got {n_frames}")
+    if fps < 1:
+        raise ValueError(f"Frame rate must be at least 1 fps, got {fps}")
+    if fmt == 'mp4':
+        find_ffmpeg()
+    wave_params(freq, epsilon_r, sigma, mu_r)
+    params = (freq, amplitude, epsilon_r, sigma, mu_r)
+
+    if fmt == 'png':
+        os.makedirs(output, exist_ok=True)
+        render_frames(view, params, n_frames, output, dpi, workers, progress)
+        return
+
+    with tempfile.TemporaryDirectory() as frame_dir:
+        render_frames(view, params, n_frames, frame_dir, dpi, workers, progress)
+        if fmt == 'mp4':
+            stitch_mp4(frame_dir, output, fps)
+        else:
+            stitch_gif(frame_dir, output, fps, n_frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the EM wave animation without a display.")
+    parser.add_argument('output', help="output file (.mp4/.gif) or directory for a PNG sequence")
+    parser.add_argument('--view', choices=sorted(FIGURE_BUILDERS), default='2d')
+    parser.add_argument('--format', dest='fmt', choices=EXPORT_FORMATS,
+                        help="defaults to the output file extension")
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help="defaults to the number of cores")
+    parser.add_argument('--freq', type=float, default=1.5e8, help="frequency in Hz")
+    parser.add_argument('--amplitude', type=float, default=1.0)
+    parser.add_argument('--epsilon-r', type=float, default=1.0)
+    parser.add_argument('--sigma', type=float, default=0.01)
+    parser.add_argument('--mu-r', type=float, default=1.0)
+    args = parser.parse_args()
+
+    def progress(done, total):
+        print(f"\rRendered {done}/{total} frames", end='', flush=True)
+
+    try:
+        export_animation(args.output, args.view, args.fmt, args.frames, args.fps,
+                         args.freq, args.amplitude, args.epsilon_r, args.sigma, args.mu_r,
+                         args.dpi, args.workers, progress)
+    except (ValueError, RuntimeError) as error:
+        parser.error(str(error))
+    print()
+
+
+if __name__ == "__main__":
+    main()
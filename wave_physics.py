@@ -0,0 +1,327 @@
+import functools
+from collections import namedtuple
+
+import numpy as np
+
+
+# Physical constants
+EPSILON_0 = 8.854e-12  # Permittivity of free space
+MU_0 = 4 * np.pi * 1e-7  # Permeability of free space
+ETA_AIR = 376.73  # Intrinsic impedance of air
+
+# Geometry and display scaling shared by the 2D and 3D views
+BOUNDARY_X = 1.0  # Air for x <= 1, lossy dielectric beyond
+B_FIELD_SCALE = 40  # B-field is drawn 40 times larger for better visibility
+
+# Scalar results are memoized in bounded LRU caches. Inputs are rounded to
+# CACHE_DIGITS significant digits first, so values that differ only by float
+# noise (a slider scrubbed back to the same spot, a preset entered again)
+# share one entry.
+CACHE_DIGITS = 9
+CACHE_SIZE = 512
+
+
+def format_frequency(value):
+    if value >= 1e9:
+        return f"{value / 1e9:.2f} GHz"
+    elif value >= 1e6:
+        return f"{value / 1e6:.2f} MHz"
+    elif value >= 1e3:
+        return f"{value / 1e3:.2f} kHz"
+    else:
+        return f"{value:.2f} Hz"
+def format_distance(value, precision=1):
+    if value >= 1:
+        return f"{value :.{precision}f} m"
+    elif value >= 1e-2:
+        return f"{value * 1e2:.{precision}f} cm"
+    else:
+        return f"{value * 1e3:.{precision}f} mm"
+
+def format_scientific(value, precision=1):
+    def format_part(part):
+        formatted_part = f"{part:.{precision}e}"
+        base, exponent = formatted_part.split("e")
+        exponent = int(exponent)
+        if exponent == 0:
+            return f"{float(base):.{precision}f}"
+        else:
+            return f"{float(base):.{precision}f} x 10^({exponent})"
+
+    if isinstance(value, complex):
+        real_part = format_part(value.real)
+        imag_part = format_part(value.imag)
+        if value.imag > 0: return f"{real_part} + j{imag_part}"
+        elif value.imag < 0: return f"{real_part} - j{imag_part[1:]}"
+        else: return f"{real_part}"
+    else:
+
+        return format_part(value)
+
+
+# Vectorized solver: every argument may be a scalar or a NumPy array, and the
+# arrays are broadcast against each other (e.g. a frequency x epsilon_r grid).
+# Returns the same tuple as calculate_wave_params, one array per quantity.
+def solve_wave_params(freq, epsilon_r, sigma, mu_r):
+    freq, epsilon_r, sigma, mu_r = np.broadcast_arrays(
+        np.asarray(freq, dtype=float), np.asarray(epsilon_r, dtype=float),
+        np.asarray(sigma, dtype=float), np.asarray(mu_r, dtype=float))
+    omega = 2 * np.pi * freq
+    epsilon = epsilon_r * EPSILON_0  # Permittivity of the dielectric
+    mu = mu_r * MU_0  # Permeability of the dielectric
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Complex permittivity
+        epsilon_complex = epsilon - 1j * sigma / omega
+
+        # Complex wavenumber, taking the root whose alpha is positive
+        k = -1.j * omega * np.sqrt(mu * epsilon_complex)
+        k = np.where(k.real <= 0, -k, k)
+
+        # Phase and attenuation constants
+        beta = k.imag
+        alpha = k.real
+        # Phase Velocity
+        v_p = np.where(beta != 0, omega / beta, np.inf)
+        #eta
+        eta = 1j * omega * mu / k
+
+        # Transition frequency
+        ft = np.where(epsilon != 0, sigma / (2 * np.pi * epsilon), np.inf)
+
+        # Skin depth
+        skin_depth = np.where(alpha != 0, 1 / alpha, np.inf)
+
+    return omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta
+
+# Everything the parameter panel shows, as arrays over broadcast inputs
+# (the E-B phase difference is in radians)
+def solve_wave_table(freq, epsilon_r, sigma, mu_r):
+    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = solve_wave_params(
+        freq, epsilon_r, sigma, mu_r)
+    k1 = 1 / eta
+    with np.errstate(divide='ignore'):
+        wavelength = 2 * np.pi / beta
+    return {
+        'alpha': alpha,
+        'beta': beta,
+        'eta_real': eta.real,
+        'eta_imag': eta.imag,
+        'wavelength': wavelength,
+        'v_p': v_p,
+        'skin_depth': skin_depth,
+        'ft': ft,
+        'eb_phase': np.arctan2(k1.imag, k1.real),
+    }
+
+def quantize(value, digits=CACHE_DIGITS):
+    return float(f"{value:.{digits - 1}e}")
+
+# Scalar version of solve_wave_params returning plain Python numbers:
+# (omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta). Cached.
+def calculate_wave_params(freq, epsilon_r, sigma, mu_r):
+    return _calculate_wave_params(quantize(freq), quantize(epsilon_r), quantize(sigma), quantize(mu_r))
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _calculate_wave_params(freq, epsilon_r, sigma, mu_r):
+    try:
+        params = solve_wave_params(freq, epsilon_r, sigma, mu_r)
+    except (ZeroDivisionError, ValueError):
+        return None, None, None, None, None, None, None, None
+    # Scalar inputs give 0-d arrays
+    return tuple(value.item() for value in params)
+
+
+# Phase constant of the air region
+def air_phase_constant(omega):
+    return np.sqrt(EPSILON_0 * MU_0) * omega
+
+# E and B fields in air (x <= 1) at a given time
+def air_fields(x, time, amplitude, omega):
+    e_field = amplitude * np.cos(omega * time - air_phase_constant(omega) * (x - BOUNDARY_X))
+    b_field = B_FIELD_SCALE * e_field / ETA_AIR
+    return e_field, b_field
+
+# Adaptive sampling of the field curves: a fixed number of points per
+# wavelength and per skin depth, capped per segment, so the curves are drawn
+# at the same accuracy whatever the frequency. Past VISIBLE_SKIN_DEPTHS the
+# wave is too small to see and the rest of the segment gets a few points.
+POINTS_PER_WAVELENGTH = 32
+POINTS_PER_SKIN_DEPTH = 16
+MIN_SEGMENT_POINTS = 16
+MAX_SEGMENT_POINTS = 2000
+MAX_SEGMENT_POINTS_3D = 600  # 3D lines are projected on every frame
+VISIBLE_SKIN_DEPTHS = 12
+TAIL_POINTS = 8
+
+# Number of samples for a segment of the given length
+def segment_points(length, beta, alpha, max_points=MAX_SEGMENT_POINTS):
+    points = max(MIN_SEGMENT_POINTS,
+                 np.ceil(length * beta / (2 * np.pi) * POINTS_PER_WAVELENGTH),
+                 np.ceil(length * alpha * POINTS_PER_SKIN_DEPTH))
+    return int(min(points, max_points))
+
+# Sample points from start to stop in a medium with phase constant beta and
+# attenuation alpha
+def adaptive_samples(start, stop, beta, alpha=0.0, max_points=MAX_SEGMENT_POINTS):
+    length = stop - start
+    if alpha > 0 and VISIBLE_SKIN_DEPTHS / alpha < length:
+        visible = VISIBLE_SKIN_DEPTHS / alpha
+        head = np.linspace(start, start + visible, segment_points(visible, beta, alpha, max_points))
+        tail = np.linspace(start + visible, stop, TAIL_POINTS)[1:]
+        return np.concatenate((head, tail))
+    return np.linspace(start, stop, segment_points(length, beta, alpha, max_points))
+
+# Sample points of the air segment (0 to the boundary) and the dielectric
+# segment (boundary to x_max) for one parameter set
+def adaptive_grid(omega, beta, alpha, x_max=5.0, max_points=MAX_SEGMENT_POINTS):
+    x_air = adaptive_samples(0.0, BOUNDARY_X, air_phase_constant(omega), 0.0, max_points)
+    x_dielectric = adaptive_samples(BOUNDARY_X, x_max, beta, alpha, max_points)
+    return x_air, x_dielectric
+
+# Attenuated amplitude inside the lossy dielectric, starting from the boundary
+def attenuation_envelope(x, amplitude, alpha):
+    return amplitude * np.exp(-alpha * (x - BOUNDARY_X))
+
+# E and B fields in the lossy dielectric (x > 1) at a given time; the amplitude
+# is continuous at the boundary
+def dielectric_fields(x, time, amplitude, omega, beta, alpha, eta):
+    phase = omega * time - beta * (x - BOUNDARY_X)
+    envelope = attenuation_envelope(x, amplitude, alpha)
+    k1 = 1 / eta
+    e_field = envelope * np.cos(phase)
+    b_field = B_FIELD_SCALE * (envelope * np.cos(phase) * k1.real + envelope * np.sin(phase) * k1.imag)
+    return e_field, b_field
+
+
+# Time-independent spatial terms of the fields for one parameter set. The
+# fields are time-harmonic, so every curve is Re{phasor(x) * e^(j*omega*t)}:
+# the complex phasors of the four stacked curves (E and B in air, E and B in
+# the dielectric) are computed once, and a frame is a rotation of them. With
+# frames_per_period set, one period is also rendered once into a ring buffer
+# and frames are replayed from it, with the phase rounded to the nearest
+# precomputed frame. Build a new cache whenever the inputs change.
+class FieldCache:
+    def __init__(self, x_air, x_dielectric, amplitude, omega, beta, alpha, eta, frames_per_period=None):
+        self.x_air = np.asarray(x_air, dtype=float)
+        self.x_dielectric = np.asarray(x_dielectric, dtype=float)
+        self.omega = omega
+        self.envelope = attenuation_envelope(self.x_dielectric, amplitude, alpha)
+
+        # B in the dielectric is envelope*(cos(phase)*Re(1/eta) + sin(phase)*Im(1/eta)),
+        # whose phasor is the E phasor times conj(1/eta)
+        k1 = 1 / eta
+        e_air = amplitude * np.exp(-1j * air_phase_constant(omega) * (self.x_air - BOUNDARY_X))
+        e_dielectric = self.envelope * np.exp(-1j * beta * (self.x_dielectric - BOUNDARY_X))
+        self.phasors = np.concatenate((
+            e_air,
+            B_FIELD_SCALE * e_air / ETA_AIR,
+            e_dielectric,
+            B_FIELD_SCALE * np.conj(k1) * e_dielectric,
+        ))
+        n_air = len(self.x_air)
+        self._splits = [n_air, 2 * n_air, 2 * n_air + len(self.x_dielectric)]
+        self._real = np.ascontiguousarray(self.phasors.real)
+        self._imag = np.ascontiguousarray(self.phasors.imag)
+        self._buffer = np.empty_like(self._real)
+
+        self.frames_per_period = frames_per_period
+        self._ring = None
+        if frames_per_period:
+            angles = 2 * np.pi * np.arange(frames_per_period) / frames_per_period
+            self._ring = (np.outer(np.cos(angles), self._real)
+                          - np.outer(np.sin(angles), self._imag))
+
+    # Splits a stacked array into (e_air, b_air, e_dielectric, b_dielectric)
+    def split(self, stacked):
+        return np.split(stacked, self._splits)
+
+    # Phasors of (e_air, b_air, e_dielectric, b_dielectric)
+    def phasor_parts(self):
+        return self.split(self.phasors)
+
+    # Returns (e_air, b_air, e_dielectric, b_dielectric) at the given time. The
+    # arrays are views into a buffer that is overwritten on the next call, or
+    # into the start of out (a flat float array) when given.
+    def fields(self, time, out=None):
+        angle = self.omega * time
+        if self._ring is not None:
+            index = int(round(angle / (2 * np.pi) * self.frames_per_period)) % self.frames_per_period
+            if out is None:
+                return self.split(self._ring[index])
+            buffer = out[:len(self._real)]
+            buffer[:] = self._ring[index]
+            return self.split(buffer)
+        buffer = self._buffer if out is None else out[:len(self._real)]
+        np.multiply(self._real, np.cos(angle), out=buffer)
+        buffer -= np.sin(angle) * self._imag
+        return self.split(buffer)
+
+
+# Derived values of one parameter set: the wave parameters, gamma, the
+# wavelength, the E-B phase difference (radians) and the panel texts that do
+# not depend on the amplitude
+WaveSummary = namedtuple('WaveSummary', 'params gamma wavelength phase_difference text')
+
+# Cached like calculate_wave_params
+def wave_summary(freq, epsilon_r, sigma, mu_r):
+    return _wave_summary(quantize(freq), quantize(epsilon_r), quantize(sigma), quantize(mu_r))
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _wave_summary(freq, epsilon_r, sigma, mu_r):
+    params = _calculate_wave_params(freq, epsilon_r, sigma, mu_r)
+    omega, beta, alpha, epsilon_complex, ft, skin_depth, v_p, eta = params
+
+    # Calculate complex propagation constant (gamma)
+    gamma = alpha + 1j * beta
+    wavelength = 2 * np.pi / beta
+
+    k1 = 1 / eta
+    # Calculate phase difference
+    phase_difference = np.arctan2(k1.imag, k1.real)
+    phase_difference_degrees = np.degrees(phase_difference)
+
+    text = {
+        "Transition Frequency": format_frequency(ft),
+        "Behavior": 'Dielectric' if freq > ft else 'Conductor',
+        "Skin Depth": "∞ m" if np.isinf(skin_depth) else format_distance(skin_depth, 3),
+        "Phase Velocity": "∞ m/s" if np.isinf(v_p) else format_scientific(v_p, 3) + " m/s",
+        "Complex ε": format_scientific(epsilon_complex, 3),
+        "Propagation constant(γ)": format_scientific(gamma, 3) + " m⁻¹",
+        "Attenuation constant(α)": format_scientific(alpha, 3) + " Np/m",
+        "Phase constant(β)": format_scientific(beta, 3) + " rad/m",
+        "Wavelength(λ)": format_distance(wavelength, 3),
+        "Intrinsic Impedance(η)": f"{eta:.2f}" + " Ω",
+        "E-B Phase Difference": f"{phase_difference_degrees:.2f}° ({phase_difference:.2f} rad)",
+    }
+    return WaveSummary(params, gamma, wavelength, phase_difference, text)
+
+# Values shown in the parameter panel, keyed by panel label. Cached; the
+# returned dict is a fresh copy.
+def describe_wave(freq, amplitude, epsilon_r, sigma, mu_r):
+    return dict(_describe_wave(quantize(freq), quantize(amplitude), quantize(epsilon_r),
+                               quantize(sigma), quantize(mu_r)))
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _describe_wave(freq, amplitude, epsilon_r, sigma, mu_r):
+    summary = _wave_summary(freq, epsilon_r, sigma, mu_r)
+    eta = summary.params[7]
+    b_magnitude = amplitude / abs(eta)
+    b_magnitude_text = format_scientific(b_magnitude, 3) + " T"
+    description = {"B-field Magnitude": b_magnitude_text + " (Increased 40 times for \nbetter visibility)"}
+    description.update(summary.text)
+    return description
+
+_CACHES = {
+    'calculate_wave_params': _calculate_wave_params,
+    'wave_summary': _wave_summary,
+    'describe_wave': _describe_wave,
+}
+
+# Hit/miss statistics of the scalar caches, as {name: CacheInfo}
+def cache_info():
+    return {name: cached.cache_info() for name, cached in _CACHES.items()}
+
+def cache_clear():
+    for cached in _CACHES.values():
+        cached.cache_clear()
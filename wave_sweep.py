@@ -0,0 +1,236 @@
+import argparse
+import csv
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from wave_physics import solve_wave_table
+from dispersion import DispersionTable, MATERIALS, material_table
+from session import create_session, SESSION_EXTENSION
+
+
+INPUT_COLUMNS = ['material', 'freq', 'epsilon_r', 'sigma', 'mu_r']
+OUTPUT_COLUMNS = ['alpha', 'beta', 'eta_real', 'eta_imag', 'wavelength', 'v_p',
+                  'skin_depth', 'ft', 'eb_phase']
+COLUMNS = INPUT_COLUMNS + OUTPUT_COLUMNS
+
+
+# Reads a material table (CSV with epsilon_r, sigma and mu_r columns; mu_r
+# defaults to 1) into an (n, 3) array
+def read_materials(path):
+    rows = []
+    with open(path, newline='') as fh:
+        for row in csv.DictReader(fh):
+            rows.append((float(row['epsilon_r']), float(row['sigma']), float(row.get('mu_r') or 1.0)))
+    return np.array(rows, dtype=float).reshape(-1, 3)
+
+def frequency_range(start, stop, points, log=True):
+    if log:
+        return np.logspace(np.log10(start), np.log10(stop), points)
+    return np.linspace(start, stop, points)
+
+# Yields the sweep of every material against every frequency as dicts of
+# column arrays, at most chunk_rows rows at a time. A material is either an
+# (epsilon_r, sigma, mu_r) tuple or a DispersionTable, whose rows get the
+# effective epsilon_r and sigma at their frequency.
+def sweep_chunks(materials, freqs, chunk_rows=1_000_000):
+    tables = {i: m for i, m in enumerate(materials) if isinstance(m, DispersionTable)}
+    materials = np.array([(1.0, 0.0, m.mu_r) if i in tables else tuple(m)
+                          for i, m in enumerate(materials)], dtype=float).reshape(-1, 3)
+    freqs = np.asarray(freqs, dtype=float)
+    total = len(materials) * len(freqs)
+    for start in range(0, total, chunk_rows):
+        rows = np.arange(start, min(start + chunk_rows, total))
+        material = rows // len(freqs)
+        chunk = {
+            'material': material,
+            'freq': freqs[rows % len(freqs)],
+            'epsilon_r': materials[material, 0],
+            'sigma': materials[material, 1],
+            'mu_r': materials[material, 2],
+        }
+        for i, table in tables.items():
+            rows_of_table = material == i
+            if rows_of_table.any():
+                chunk['epsilon_r'][rows_of_table], chunk['sigma'][rows_of_table] = table(chunk['freq'][rows_of_table])
+        chunk.update(solve_wave_table(chunk['freq'], chunk['epsilon_r'], chunk['sigma'], chunk['mu_r']))
+        yield chunk
+
+
+# Writers take chunks one at a time, so memory stays bounded by the chunk size.
+# close() completes the output; abort() removes whatever was written so far,
+# so a failed sweep never leaves a file that looks complete. abort() may also
+# follow a close() that failed half way.
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+class CsvWriter:
+    def __init__(self, path, total_rows):
+        self.path = path
+        self.fh = open(path, 'w', newline='')
+        self.fh.write(','.join(COLUMNS) + '\n')
+
+    def write(self, chunk):
+        table = np.column_stack([chunk[name] for name in COLUMNS])
+        np.savetxt(self.fh, table, delimiter=',', fmt=['%d'] + ['%.10g'] * (len(COLUMNS) - 1))
+
+    def close(self):
+        self.fh.close()
+
+    def abort(self):
+        self.fh.close()
+        _remove(self.path)
+
+class ParquetWriter:
+    def __init__(self, path, total_rows):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)") from None
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk):
+        table = self.pa.table({name: chunk[name] for name in COLUMNS})
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def abort(self):
+        try:
+            if self.writer is not None:
+                self.writer.close()
+        finally:
+            _remove(self.path)
+
+# Same layout as np.savez (one array per column), but the columns are first
+# filled chunk by chunk in memory-mapped temporary files
+class NpzWriter:
+    def __init__(self, path, total_rows):
+        self.path = path
+        self.tmpdir = tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path)))
+        self.columns = {
+            name: np.lib.format.open_memmap(os.path.join(self.tmpdir.name, name + '.npy'), mode='w+',
+                                            dtype=np.int64 if name == 'material' else np.float64,
+                                            shape=(total_rows,))
+            for name in COLUMNS
+        }
+        self.offset = 0
+
+    def write(self, chunk):
+        stop = self.offset + len(chunk['freq'])
+        for name, column in self.columns.items():
+            column[self.offset:stop] = chunk[name]
+        self.offset = stop
+
+    def close(self):
+        with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name, column in self.columns.items():
+                column.flush()
+                zf.write(column.filename, arcname=name + '.npy')
+        self.columns = {}
+        self.tmpdir.cleanup()
+
+    def abort(self):
+        # The maps must go before the files can be removed on every platform
+        self.columns = {}
+        self.tmpdir.cleanup()
+        _remove(self.path)
+
+# Session file (session.py) with one array per column, filled chunk by chunk
+# in place; load_session maps the columns back without reading them
+class SessionWriter:
+    def __init__(self, path, total_rows):
+        self.path = path
+        self.columns = create_session(
+            path, {'kind': 'sweep', 'columns': COLUMNS, 'rows': total_rows},
+            {name: (np.int64 if name == 'material' else np.float64, (total_rows,)) for name in COLUMNS})
+        self.offset = 0
+
+    def write(self, chunk):
+        stop = self.offset + len(chunk['freq'])
+        for name, column in self.columns.items():
+            column[self.offset:stop] = chunk[name]
+        self.offset = stop
+
+    def close(self):
+        for column in self.columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
+        self.columns = {}
+
+    def abort(self):
+        self.columns = {}
+        _remove(self.path)
+
+WRITERS = {'.csv': CsvWriter, '.parquet': ParquetWriter, '.npz': NpzWriter, SESSION_EXTENSION: SessionWriter}
+
+# Runs the sweep and streams it to path; the format follows the extension
+def run_sweep(path, materials, freqs, chunk_rows=1_000_000, progress=None):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported output format {extension!r}; use one of {', '.join(WRITERS)}")
+    if chunk_rows < 1:
+        raise ValueError(f"chunk_rows must be at least 1, got {chunk_rows}")
+    total = len(materials) * len(freqs)
+    writer = WRITERS[extension](path, total)
+    done = 0
+    try:
+        for chunk in sweep_chunks(materials, freqs, chunk_rows):
+            writer.write(chunk)
+            done += len(chunk['freq'])
+            if progress:
+                progress(done, total)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep materials against a frequency range and write every wave parameter.")
+    parser.add_argument('output', help=f"output file: .csv, .parquet, .npz or {SESSION_EXTENSION}")
+    parser.add_argument('--materials', help="CSV file with epsilon_r, sigma and mu_r columns")
+    parser.add_argument('--material', nargs=3, type=float, action='append', default=[],
+                        metavar=('EPSILON_R', 'SIGMA', 'MU_R'), help="add one material (repeatable)")
+    parser.add_argument('--library', action='append', default=[], choices=list(MATERIALS),
+                        metavar='NAME', help=f"add a dispersive material: {', '.join(MATERIALS)} (repeatable)")
+    parser.add_argument('--freq-start', type=float, default=1e7)
+    parser.add_argument('--freq-stop', type=float, default=2e9)
+    parser.add_argument('--freq-points', type=int, default=1000)
+    parser.add_argument('--linear', action='store_true', help="linear instead of logarithmic frequency steps")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    if args.chunk_rows < 1:
+        parser.error("--chunk-rows must be at least 1")
+
+    materials = [tuple(m) for m in args.material]
+    if args.materials:
+        materials.extend(map(tuple, read_materials(args.materials)))
+    materials.extend(material_table(name) for name in args.library)
+    if not materials:
+        parser.error("give at least one material with --materials, --material or --library")
+
+    freqs = frequency_range(args.freq_start, args.freq_stop, args.freq_points, log=not args.linear)
+
+    def progress(done, total):
+        print(f"\rWrote {done}/{total} rows", end='', flush=True)
+
+    run_sweep(args.output, materials, freqs, args.chunk_rows, progress)
+    print()
+
+
+if __name__ == "__main__":
+    main()